@@ -14,6 +14,7 @@ class Candidate:
         self.last_place_votes = 0
 
         self.greatest_pairwise_defeat = 0  # for minimax
+        self.path_defeats = 0  # for schulze
 
     # overloading operators to compare candidates
     def __eq__(self,other):
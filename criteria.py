@@ -0,0 +1,214 @@
+import numpy as np
+
+
+# the criteria the evaluator knows about, bit i of a violation mask is criteria[i] of the evaluator
+CRITERIA = ("condorcet", "condorcet_loser", "majority", "unanimity", "IIA", "transitivity")
+
+
+# a value of EvaluationContext that is computed the first time it is read and reused after that
+# every read is recorded in the context's stats, so it shows how many recomputations the memo saved
+class memoized:
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+
+    def __get__(self, context, owner):
+        if context is None:
+            return self
+        counts = context.stats.setdefault(self.name, {"computed": 0, "reused": 0})
+        if self.name in context.values:
+            counts["reused"] += 1
+        else:
+            context.values[self.name] = self.func(context)
+            counts["computed"] += 1
+        return context.values[self.name]
+
+
+# everything the criteria checks share for one batch of schedules (num_trials x n!)
+# each value is computed the first time a check asks for it and reused by every other check after that
+# stats is where the computed/reused counts go, by default the system's context_stats
+class EvaluationContext:
+    def __init__(self, system, schedules, rng=None, stats=None):
+        self.system = system
+        self.schedules = np.atleast_2d(schedules)
+        self.rng = system.rng if rng is None else rng
+        self.stats = system.context_stats if stats is None else stats
+        self.values = {}
+
+    # a context for another system on the same schedules, keeping whatever was already computed that does not
+    # depend on the system (so systems compared on the same schedules share one pairwise matrix per schedule)
+    def for_system(self, system):
+        context = EvaluationContext(system, self.schedules, self.rng)
+        for name in SHARED:
+            if name in self.values:
+                context.values[name] = self.values[name]
+        return context
+
+    # with few voters a batch has many repeats (3 voters and 3 candidates only have 56 schedules), so the
+    # pairwise matrices, the rankings and the IIA resamples are worked out once per distinct schedule and
+    # handed back to every copy, the random tie breaks are still drawn for every schedule on its own
+    # (systems that break ties at random inside their ranking, like Top Two, rank and resample every copy)
+    @memoized
+    def distinct(self):
+        if len(self.schedules) == 1:
+            return self.schedules, np.zeros(1, dtype=np.intp), np.ones(1, dtype=np.int64)
+        return unique_schedules(self.schedules)
+
+    @memoized
+    def distinct_pairwise(self):
+        return self.system.order_tables.pairwise_matrix(self.distinct[0])
+
+    @memoized
+    def pairwise(self):
+        return self.distinct_pairwise[self.distinct[1]]
+
+    # pairwise[a][b] > pairwise[b][a], who wins each head to head
+    @memoized
+    def beats(self):
+        return self.pairwise > np.swapaxes(self.pairwise, 1, 2)
+
+    @memoized
+    def first_votes(self):
+        return self.schedules @ self.system.order_tables.score_matrix((1,))
+
+    @memoized
+    def ranking(self):
+        if self.system.breaks_ties_at_random:
+            pairwise = self.pairwise if self.system.uses_pairwise else None
+            return self.system.cached_rank_and_score(self.schedules, pairwise)
+        distinct, inverse, _ = self.distinct
+        pairwise = self.distinct_pairwise if self.system.uses_pairwise else None
+        ranks, scores = self.system.cached_rank_and_score(distinct, pairwise)
+        return ranks[inverse], scores[inverse]
+
+    @memoized
+    def ranks(self):
+        return self.ranking[0]
+
+    # the winner of every schedule, ties for first are broken at random like determine_winner does
+    @memoized
+    def winners(self):
+        tie_break = np.where(self.ranks == 0, self.rng.random(self.ranks.shape), -1)
+        return np.argmax(tie_break, axis=1)
+
+    # the Condorcet candidate of every schedule, -1 if there is none
+    @memoized
+    def condorcet_winners(self):
+        return self.single_index(self.beats.sum(axis=2) == self.system.num_cands - 1)
+
+    @memoized
+    def condorcet_losers(self):
+        return self.single_index(self.beats.sum(axis=1) == self.system.num_cands - 1)
+
+    # the candidate with more than half of the first place votes, -1 if there is none
+    @memoized
+    def majority_winners(self):
+        return self.single_index(2 * self.first_votes > self.system.num_voters)
+
+    # the index of the only True entry of each row, or -1 for rows without one
+    def single_index(self, mask):
+        return np.where(mask.any(axis=1), np.argmax(mask, axis=1), -1)
+
+
+# the criteria that depend on which candidate wins (and so on how ties for first are broken)
+WINNER_CRITERIA = ("condorcet", "condorcet_loser", "majority")
+
+
+# the values of a context that only depend on the schedules
+SHARED = ("distinct", "distinct_pairwise", "pairwise", "beats", "first_votes", "condorcet_winners", "condorcet_losers",
+          "majority_winners")
+
+
+# each check returns one bool per schedule of the context
+
+def violates_condorcet(context):
+    cond = context.condorcet_winners
+    return (cond >= 0) & (context.winners != cond)
+
+
+def violates_condorcet_loser(context):
+    return context.winners == context.condorcet_losers
+
+
+def violates_majority(context):
+    major = context.majority_winners
+    return (major >= 0) & (context.winners != major)
+
+
+# a pair every voter agrees on has to keep that order in the societal ranking
+# (for Pairwise Majority in the majority relation, it has to win its head to head)
+def violates_unanimity(context):
+    unanimous = context.pairwise == context.system.num_voters
+    if context.system.type() == "Pairwise Majority":
+        return (unanimous & ~context.beats).any(axis=(1, 2))
+    ranks = context.ranks
+    return (unanimous & (ranks[:, :, None] >= ranks[:, None, :])).any(axis=(1, 2))
+
+
+# Pairwise Majority is checked on the (weak) majority relation, other systems on their societal ranking
+# a violation is any a >= b and b >= c without a >= c
+def violates_transitivity(context):
+    if context.system.type() == "Pairwise Majority":
+        tournaments = context.system.tournaments
+        return ~tournaments.transitive[tournaments.rows(context.pairwise)]
+    at_least = context.ranks[:, :, None] <= context.ranks[:, None, :]
+    steps = at_least.astype(np.int64)
+    return (((steps @ steps) > 0) & ~at_least).any(axis=(1, 2))
+
+
+# systems with an exact check (IIA_violations) do the whole batch at once, the others resample new schedules
+# for every pair, so they still go through violates_IIA one (distinct) schedule at a time
+# (every copy when the ranking itself is random, so each copy gets its own tie breaks and resamples)
+def violates_IIA(context):
+    if hasattr(context.system, "IIA_violations"):
+        return context.system.IIA_violations(context.pairwise, context.ranks)
+    if context.system.breaks_ties_at_random:
+        return np.array([context.system.violates_IIA(schedule) for schedule in context.schedules], dtype=bool)
+    distinct, inverse, _ = context.distinct
+    return np.array([context.system.violates_IIA(schedule) for schedule in distinct], dtype=bool)[inverse]
+
+
+CHECKS = {
+    "condorcet": violates_condorcet,
+    "condorcet_loser": violates_condorcet_loser,
+    "majority": violates_majority,
+    "unanimity": violates_unanimity,
+    "IIA": violates_IIA,
+    "transitivity": violates_transitivity,
+}
+
+
+# checks all the requested criteria on a batch of schedules in one go
+# returns one mask per schedule where bit i is set if criteria[i] is violated
+def violation_masks(system, schedules, criteria=CRITERIA, rng=None):
+    return context_masks(EvaluationContext(system, schedules, rng), criteria)
+
+
+# a criterion given as None keeps its bit at 0
+def context_masks(context, criteria=CRITERIA):
+    masks = np.zeros(len(context.schedules), dtype=np.int64)
+    for bit, criterion in enumerate(criteria):
+        if criterion is None:
+            continue
+        if criterion not in CHECKS:
+            raise ValueError(f"unknown criterion {criterion}, expected one of {list(CHECKS)}")
+        masks |= CHECKS[criterion](context).astype(np.int64) << bit
+    return masks
+
+
+# counts how many schedules had each of the 2^k combinations of violations, counts[mask]
+def joint_counts(masks, num_criteria):
+    return np.bincount(masks, minlength=2 ** num_criteria)
+
+
+# the distinct schedules of a batch, where each schedule of the batch is among them (batch = distinct[inverse])
+# and how many times each one appears
+def unique_schedules(batch):
+    distinct, inverse, counts = np.unique(batch, axis=0, return_inverse=True, return_counts=True)
+    return distinct, inverse.ravel(), counts
+
+
+# how many schedules violated each criterion, from the joint counts
+def marginal_counts(counts, criteria=CRITERIA):
+    patterns = np.arange(len(counts))
+    return {criterion: counts[(patterns >> bit) & 1 == 1].sum().item() for bit, criterion in enumerate(criteria)}
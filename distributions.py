@@ -46,4 +46,40 @@ def custom_distribution(num_voters, num_cands, weights):
                 arr[j] += 1
                 break
 
-    return arr
\ No newline at end of file
+    return arr
+
+
+# batched versions of the generators above
+# each one returns a (num_trials x num_cands!) array where every row is a preference schedule
+# rng is a numpy.random.Generator (or a seed), the cost of a call does not depend on num_voters
+
+def generate_IC_batch(num_trials, num_voters, num_cands, rng=None):
+    rng = np.random.default_rng(rng)
+    poss_ranks = math.factorial(num_cands)
+    # every voter independently picks one of the poss_ranks orders, so the counts are multinomial
+    return rng.multinomial(num_voters, np.full(poss_ranks, 1 / poss_ranks), size=num_trials)
+
+
+def generate_IAC_batch(num_trials, num_voters, num_cands, rng=None):
+    rng = np.random.default_rng(rng)
+    poss_ranks = math.factorial(num_cands)
+    return random_compositions(num_trials, num_voters, poss_ranks, rng)
+
+
+def custom_distribution_batch(num_trials, num_voters, num_cands, weights, rng=None):
+    rng = np.random.default_rng(rng)
+    poss_ranks = math.factorial(num_cands)
+    if len(weights) != poss_ranks:
+        raise ValueError(f"expected one weight per order ({poss_ranks}), got {len(weights)}")
+    pvals = np.asarray(weights, dtype=float)
+    # the weights are normalized here, custom_distribution drops voters if the weights add up to less than 1
+    return rng.multinomial(num_voters, pvals / pvals.sum(), size=num_trials)
+
+
+# stars and bars for a whole batch: num_trials splits of total into parts, every split equally likely
+# drawing the proportions from a flat Dirichlet and then the counts from a multinomial gives exactly the
+# uniform distribution over compositions, without having to place total + parts - 1 bars one trial at a time
+def random_compositions(num_trials, total, parts, rng=None):
+    rng = np.random.default_rng(rng)
+    proportions = rng.dirichlet(np.ones(parts), size=num_trials)
+    return rng.multinomial(total, proportions)
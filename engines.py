@@ -0,0 +1,257 @@
+from collections import namedtuple
+from itertools import combinations
+import numpy as np
+
+
+# array versions of the vote counting done by the systems
+# every function here works on a single schedule (n!,) or on a batch of schedules (num_trials x n!)
+# and returns plain arrays indexed by candidate instead of writing onto Candidate objects
+
+
+# score_matrix[i][c] is what order i gives candidate c, so this is every candidate's total for every schedule
+def positional_scores(schedules, score_matrix):
+    return np.asarray(schedules) @ score_matrix
+
+
+# turns scores into ranks like create_societal_rank does: the best score gets rank 0,
+# tied candidates share a rank and the next score down gets the next rank (no gaps)
+def dense_ranks(scores, higher_is_better=True):
+    scores = np.asarray(scores)
+    keys = -scores if higher_is_better else scores
+    order = np.argsort(keys, axis=-1, kind="stable")
+    sorted_keys = np.take_along_axis(keys, order, axis=-1)
+    new_group = np.diff(sorted_keys, axis=-1) != 0
+    group = np.concatenate([np.zeros(new_group.shape[:-1] + (1,), dtype=np.intp),
+                            np.cumsum(new_group, axis=-1)], axis=-1)
+    ranks = np.empty_like(group)
+    np.put_along_axis(ranks, order, group, axis=-1)
+    return ranks
+
+
+# the candidates sharing each rank of a single ranking, tie_groups([0,1,0]) is [array([0,2]), array([1])]
+def tie_groups(ranks):
+    ranks = np.asarray(ranks)
+    return [np.flatnonzero(ranks == rank) for rank in range(ranks.max() + 1)]
+
+
+# the result of VotingSystem.societal_ranking, nothing in it can be changed after it is made
+# ranks and scores are indexed like cand_objects, with one row per schedule when a batch was ranked
+# scores are whatever the system ranks by (votes, points, round eliminated, ...)
+class RankingResult(namedtuple("RankingResult", ["ranks", "scores"])):
+    __slots__ = ()
+
+    def __new__(cls, ranks, scores):
+        ranks = np.array(ranks)
+        scores = np.array(scores)
+        ranks.flags.writeable = False
+        scores.flags.writeable = False
+        return super().__new__(cls, ranks, scores)
+
+    # the candidate indices sharing each rank (of one trial if a batch was ranked)
+    def tie_groups(self, trial=None):
+        ranks = self.ranks if trial is None else self.ranks[trial]
+        return tuple(tuple(group.tolist()) for group in tie_groups(ranks))
+
+    # the candidate indices tied for first
+    def winners(self, trial=None):
+        return self.tie_groups(trial)[0]
+
+
+# the candidate each order gives its vote to when the eliminated candidates are skipped
+# eliminated is (num_trials x n) and the result is (num_trials x n!), last=True gives the last remaining choice
+def remaining_choice(order_matrix, eliminated, last=False):
+    remaining = ~eliminated[:, order_matrix]  # remaining[t][i][p] is True if position p of order i is still in
+    if last:
+        position = order_matrix.shape[1] - 1 - np.argmax(remaining[:, :, ::-1], axis=2)
+    else:
+        position = np.argmax(remaining, axis=2)
+    return order_matrix[np.arange(len(order_matrix)), position]
+
+
+# adds up the voters of every order onto the candidate chosen by that order, one row per schedule
+def tally_choices(schedules, choices, num_cands):
+    offsets = np.arange(len(schedules))[:, None] * num_cands
+    totals = np.bincount((choices + offsets).ravel(), weights=schedules.ravel(), minlength=len(schedules) * num_cands)
+    return totals.reshape(len(schedules), num_cands).astype(schedules.dtype)
+
+
+# Borda points counting only the candidates still in, from the pairwise matrices of the schedules:
+# a voter gives 1 point plus 1 for every remaining candidate they rank below c
+def remaining_borda(schedules, pairwise, eliminated):
+    remaining = (~eliminated).astype(pairwise.dtype)
+    return schedules.sum(axis=1)[:, None] + np.einsum("tcd,td->tc", pairwise, remaining)
+
+
+# one round of each elimination system, returns the scores of the round and which candidates are eliminated
+# only the candidates in eligible can be eliminated, the other remaining candidates still count for the scores
+# scores of eliminated candidates are ignored, every round eliminates at least one eligible candidate
+
+def instant_runoff_round(schedules, tables, eliminated, pairwise, eligible):
+    votes = tally_choices(schedules, remaining_choice(tables.orders, eliminated), tables.num_cands)
+    lowest = np.where(eligible, votes, votes.max() + 1).min(axis=1, keepdims=True)
+    return votes, eligible & (votes == lowest)
+
+
+def coombs_round(schedules, tables, eliminated, pairwise, eligible):
+    last_votes = tally_choices(schedules, remaining_choice(tables.orders, eliminated, last=True), tables.num_cands)
+    most = np.where(eligible, last_votes, -1).max(axis=1, keepdims=True)
+    return last_votes, eligible & (last_votes == most)
+
+
+def baldwin_round(schedules, tables, eliminated, pairwise, eligible):
+    points = remaining_borda(schedules, pairwise, eliminated)
+    lowest = np.where(eligible, points, points.max() + 1).min(axis=1, keepdims=True)
+    return points, eligible & (points == lowest)
+
+
+def nanson_round(schedules, tables, eliminated, pairwise, eligible):
+    points = remaining_borda(schedules, pairwise, eliminated)
+    total = np.where(eligible, points, 0).sum(axis=1, keepdims=True)
+    # points <= mean of the eligible candidates, multiplied out so that it stays in integers
+    return points, eligible & (points * eligible.sum(axis=1, keepdims=True) <= total)
+
+
+PAIRWISE_ROUNDS = (baldwin_round, nanson_round)
+
+
+# runs an elimination system to the end for every schedule without rebuilding any orders
+# the order table stays fixed and the eliminated candidates are tracked as a (num_trials x n) mask
+# returns round_elim (the 1-based round each candidate went out in, like Candidate.round_elim)
+# and the scores of the final round (0 for candidates that were already out by then)
+# eliminated can mark candidates that are out from the start and kept candidates that stay in the orders
+# but are never eliminated themselves (the election ends when only kept candidates are left)
+def elimination_rounds(schedules, tables, round_rule, eliminated=None, pairwise=None, kept=None):
+    schedules = np.atleast_2d(schedules)
+    num_trials = len(schedules)
+    if eliminated is None:
+        eliminated = np.zeros((num_trials, tables.num_cands), dtype=bool)
+    else:
+        eliminated = np.broadcast_to(eliminated, (num_trials, tables.num_cands)).copy()
+    if kept is None:
+        kept = np.zeros(tables.num_cands, dtype=bool)
+    if pairwise is None and round_rule in PAIRWISE_ROUNDS:
+        pairwise = tables.pairwise_matrix(schedules)
+    if pairwise is not None:
+        pairwise = np.reshape(pairwise, (num_trials, tables.num_cands, tables.num_cands))
+    round_elim = np.zeros((num_trials, tables.num_cands), dtype=np.intp)
+    final_scores = np.zeros((num_trials, tables.num_cands), dtype=schedules.dtype)
+    elec_round = 1
+    running = ~(eliminated | kept).all(axis=1)
+    while running.any():
+        eligible = ~eliminated & ~kept & running[:, None]
+        scores, to_elim = round_rule(schedules, tables, eliminated, pairwise, eligible)
+        final_scores[running] = np.where(eliminated, 0, scores)[running]
+        round_elim[to_elim] = elec_round
+        eliminated |= to_elim
+        running = ~(eliminated | kept).all(axis=1)
+        elec_round += 1
+    return round_elim, final_scores
+
+
+# Coombs where a candidate with at least half the first place votes wins the round (run_election_majority)
+# the winners are taken out and the election restarts with everyone who has not won yet,
+# otherwise the candidates with the most last place votes are eliminated for the rest of that election
+# returns round_win (-1 for candidates never given a round) and the next round number for every schedule
+def coombs_majority_rounds(schedules, tables, num_voters, won=None, first_round=1):
+    schedules = np.atleast_2d(schedules)
+    num_trials = len(schedules)
+    if won is None:
+        won = np.zeros((num_trials, tables.num_cands), dtype=bool)
+    else:
+        won = np.broadcast_to(won, (num_trials, tables.num_cands)).copy()
+    out = won.copy()  # out of the current election, either won already or eliminated
+    round_win = np.full((num_trials, tables.num_cands), -1, dtype=np.intp)
+    elec_round = np.full(num_trials, first_round, dtype=np.intp)
+    running = ~won.all(axis=1) & ~out.all(axis=1)
+    while running.any():
+        last_votes = tally_choices(schedules, remaining_choice(tables.orders, out, last=True), tables.num_cands)
+        first_votes = tally_choices(schedules, remaining_choice(tables.orders, out), tables.num_cands)
+        majority = ~out & (first_votes * 2 >= num_voters) & running[:, None]
+        has_majority = majority.any(axis=1)
+
+        # rounds with majority winners
+        round_win[majority] = np.broadcast_to(elec_round[:, None], majority.shape)[majority]
+        won |= majority
+        elec_round[has_majority] += 1
+        out[has_majority] = won[has_majority]
+
+        # rounds without one eliminate the candidates with the most last place votes
+        eliminating = running & ~has_majority
+        most = np.where(out, -1, last_votes).max(axis=1, keepdims=True)
+        to_elim = ~out & (last_votes == most) & eliminating[:, None]
+        out |= to_elim
+        # if everyone left is eliminated at once they all get this round and the election is over
+        emptied = eliminating & out.all(axis=1)
+        last_ones = to_elim & emptied[:, None]
+        round_win[last_ones] = np.broadcast_to(elec_round[:, None], last_ones.shape)[last_ones]
+
+        running = running & ~emptied & ~won.all(axis=1) & ~out.all(axis=1)
+    return round_win, elec_round
+
+
+# Ranked Pairs on a batch of pairwise matrices (num_trials x n x n), returns the rank of every candidate
+# the pairs are locked in from the biggest margin down (ties keep the combinations order) unless they would
+# create a cycle, and the candidates come out in the order of a topological sort of the locked graph (Kahn's
+# algorithm with a first in first out queue, taking the candidates in index order)
+# reach[t][c] is a bitset of the candidates c reaches through locked pairs (c included), so checking for a cycle
+# is one bit test and locking a -> b adds reach[b] to everyone that reaches a, every step runs on all trials at once
+# the bitsets are uint64, so at most 64 candidates
+def ranked_pairs_ranks(pairwise):
+    pairwise = np.asarray(pairwise)
+    num_trials, num_cands = pairwise.shape[0], pairwise.shape[1]
+    if num_cands > 64:
+        raise ValueError(f"Ranked Pairs handles at most 64 candidates, got {num_cands}")
+    trials = np.arange(num_trials)
+    pairs = np.array(list(combinations(range(num_cands), 2)), dtype=np.intp).reshape(-1, 2)
+    margins = pairwise[:, pairs[:, 0], pairs[:, 1]] - pairwise[:, pairs[:, 1], pairs[:, 0]]
+    winners = np.where(margins > 0, pairs[:, 0], pairs[:, 1])
+    losers = np.where(margins > 0, pairs[:, 1], pairs[:, 0])
+    sizes = np.abs(margins)
+    by_size = np.argsort(-sizes, axis=1, kind="stable")
+
+    locked = np.zeros((num_trials, num_cands, num_cands), dtype=bool)
+    reach = np.broadcast_to(np.uint64(1) << np.arange(num_cands, dtype=np.uint64), (num_trials, num_cands)).copy()
+    for step in range(len(pairs)):
+        pair = by_size[:, step]
+        winner = winners[trials, pair]
+        loser = losers[trials, pair]
+        cycle = (reach[trials, loser] >> winner.astype(np.uint64)) & np.uint64(1) == 1
+        lock = (sizes[trials, pair] > 0) & ~cycle
+        locked[trials[lock], winner[lock], loser[lock]] = True
+        reaches_winner = ((reach >> winner.astype(np.uint64)[:, None]) & np.uint64(1) == 1) & lock[:, None]
+        reach |= np.where(reaches_winner, reach[trials, loser][:, None], np.uint64(0))
+
+    # Kahn's algorithm, one candidate leaves the queue per step in every trial
+    in_degree = locked.sum(axis=1)
+    queue = np.zeros((num_trials, num_cands), dtype=np.intp)
+    tail = np.zeros(num_trials, dtype=np.intp)
+    freed = in_degree == 0
+    for step in range(num_cands):
+        rows, cols = np.nonzero(freed)
+        queue[rows, (tail[:, None] + np.cumsum(freed, axis=1) - 1)[rows, cols]] = cols
+        tail += freed.sum(axis=1)
+        current = queue[:, step]
+        out = locked[trials, current]
+        in_degree -= out
+        freed = out & (in_degree == 0)
+    ranks = np.empty((num_trials, num_cands), dtype=np.intp)
+    ranks[trials[:, None], queue] = np.arange(num_cands)
+    return ranks
+
+
+# the candidates of one pairwise matrix from first to last
+def ranked_pairs_order(pairwise):
+    return np.argsort(ranked_pairs_ranks(np.asarray(pairwise)[None])[0]).tolist()
+
+
+# the strength of the strongest path from every candidate to every other for a batch of pairwise matrices
+# (num_trials x n x n), a head to head win a over b is a link of strength pairwise[a][b] and a path is as strong
+# as its weakest link, the widest path version of Floyd-Warshall runs every trial at once
+def strongest_paths(pairwise):
+    pairwise = np.asarray(pairwise)
+    paths = np.where(pairwise > np.swapaxes(pairwise, 1, 2), pairwise, 0)
+    for via in range(paths.shape[1]):
+        np.maximum(paths, np.minimum(paths[:, :, via, None], paths[:, None, via, :]), out=paths)
+    diagonal = np.arange(paths.shape[1])
+    paths[:, diagonal, diagonal] = 0
+    return paths
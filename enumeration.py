@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor
+from criteria import CRITERIA, WINNER_CRITERIA, EvaluationContext, context_masks
+import numpy as np
+import math
+import os
+
+
+# exact versions of the find_* simulations for small elections: instead of sampling schedules, every possible
+# schedule (every way of splitting num_voters over the n! orders) is checked once and weighted by how likely
+# the distribution is to produce it
+
+
+# the number of schedules, C(total + parts - 1, parts - 1)
+def composition_count(total, parts):
+    return math.comb(total + parts - 1, parts - 1)
+
+
+# every way of splitting total into parts as one array, only used for blocks that fit in a chunk
+# blocks holds the ones already built, it belongs to one call of compositions so nothing outlives the walk
+def composition_block(total, parts, blocks):
+    block = blocks.get((total, parts))
+    if block is None:
+        if parts == 1:
+            block = np.array([[total]], dtype=np.int64)
+        else:
+            block = np.vstack([np.hstack([np.full((composition_count(total - first, parts - 1), 1), first),
+                                          composition_block(total - first, parts - 1, blocks)])
+                               for first in range(total + 1)])
+        blocks[(total, parts)] = block
+    return block
+
+
+# yields the compositions of total into parts numbered start to stop - 1 (all of them by default), in chunks
+# of at most chunk_size rows, so the whole list is never in memory and slices can go to different processes
+# the compositions are numbered in lexicographic order
+def compositions(total, parts, chunk_size=100000, start=0, stop=None):
+    if stop is None:
+        stop = composition_count(total, parts)
+    pending = []
+    num_pending = 0
+    for piece in composition_pieces((), total, parts, chunk_size, start, stop, 0, {}):
+        pending.append(piece)
+        num_pending += len(piece)
+        if num_pending >= chunk_size:
+            yield np.vstack(pending)
+            pending = []
+            num_pending = 0
+    if pending:
+        yield np.vstack(pending)
+
+
+# walks down the first parts until what is left fits in a chunk, skipping whatever is outside start to stop
+# offset is the number of the first composition below prefix
+def composition_pieces(prefix, total, parts, chunk_size, start, stop, offset, blocks):
+    size = composition_count(total, parts)
+    if offset + size <= start or offset >= stop:
+        return
+    if size <= chunk_size:
+        block = composition_block(total, parts, blocks)[max(start - offset, 0):stop - offset]
+        yield np.hstack([np.broadcast_to(np.array(prefix, dtype=np.int64), (len(block), len(prefix))), block])
+        return
+    for first in range(total + 1):
+        yield from composition_pieces(prefix + (first,), total - first, parts - 1, chunk_size, start, stop, offset,
+                                      blocks)
+        offset += composition_count(total - first, parts - 1)
+
+
+# the probability of each schedule under the distribution
+# IC: each voter picks an order uniformly, so the schedule is multinomial
+# IAC: every schedule is equally likely
+# Custom: multinomial with the order probabilities in weights
+def schedule_probabilities(schedules, num_voters, distribution, weights=None):
+    num_orders = schedules.shape[1]
+    if distribution == "IAC":
+        return np.full(len(schedules), 1 / composition_count(num_voters, num_orders))
+    if distribution == "IC":
+        pvals = np.full(num_orders, 1 / num_orders)
+    elif distribution == "Custom":
+        if len(weights) != num_orders:
+            raise ValueError(f"expected one weight per order ({num_orders}), got {len(weights)}")
+        pvals = np.asarray(weights, dtype=float)
+        pvals = pvals / pvals.sum()
+    else:
+        raise ValueError(f"unknown distribution {distribution}, expected one of ['IC', 'IAC', 'Custom']")
+    log_factorials = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, num_voters + 1)))])
+    with np.errstate(divide="ignore"):
+        log_pvals = np.log(pvals)
+    # orders that cannot be picked only matter when someone picked them
+    log_terms = np.where(schedules > 0, schedules * log_pvals, 0.0)
+    return np.exp(log_factorials[num_voters] - log_factorials[schedules].sum(axis=1) + log_terms.sum(axis=1))
+
+
+# the probability of every combination of violations over the schedules numbered start to stop - 1
+# ties for the winner are averaged over instead of broken at random, every candidate tied for first
+# wins with the same share of the schedule's probability
+# for a neutral system under IC or IAC (where renaming the candidates does not change the probability) only one
+# schedule of each orbit under renaming is checked, weighted by the size of the orbit
+def exact_joint_probabilities(system, distribution, weights=None, criteria=CRITERIA, start=0, stop=None,
+                              chunk_size=100000):
+    num_orders = math.factorial(system.num_cands)
+    other_criteria = [c if c not in WINNER_CRITERIA else None for c in criteria]
+    winner_criteria = [c if c in WINNER_CRITERIA else None for c in criteria]
+    use_symmetry = system.is_neutral and distribution in ("IC", "IAC")
+    joint = np.zeros(2 ** len(criteria))
+    for chunk in compositions(system.num_voters, num_orders, chunk_size, start, stop):
+        probabilities = schedule_probabilities(chunk, system.num_voters, distribution, weights)
+        if use_symmetry:
+            representatives, orbit_sizes = system.order_tables.canonical_relabeling(chunk)
+            keep = (representatives == chunk).all(axis=1)
+            chunk = chunk[keep]
+            probabilities = probabilities[keep] * orbit_sizes[keep]
+            # a chunk (or a slice from exact_joint_parallel) can hold no representative at all
+            if not len(chunk):
+                continue
+        context = EvaluationContext(system, chunk)
+        masks = context_masks(context, other_criteria)
+        if not any(winner_criteria):
+            joint += np.bincount(masks, weights=probabilities, minlength=2 ** len(criteria))
+            continue
+
+        # one pass per place in the tie for first, each tied candidate gets 1 / (size of the tie)
+        tied = context.ranks == 0
+        num_tied = tied.sum(axis=1)
+        tied_order = np.argsort(~tied, axis=1, kind="stable")
+        for place in range(num_tied.max()):
+            context.values["winners"] = tied_order[:, place]
+            place_masks = masks | context_masks(context, winner_criteria)
+            share = np.where(place < num_tied, probabilities / num_tied, 0.0)
+            joint += np.bincount(place_masks, weights=share, minlength=2 ** len(criteria))
+    return joint
+
+
+# splits the schedules into num_workers slices and adds up the probabilities of each slice
+# (num_workers=None uses every core)
+def exact_joint_parallel(system, distribution, weights=None, criteria=CRITERIA, num_workers=1,
+                         chunk_size=100000):
+    total = composition_count(system.num_voters, math.factorial(system.num_cands))
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    bounds = [total * i // num_workers for i in range(num_workers + 1)]
+    if num_workers == 1:
+        return exact_joint_probabilities(system, distribution, weights, criteria, chunk_size=chunk_size)
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(exact_joint_probabilities, system, distribution, weights, criteria,
+                                   bounds[i], bounds[i + 1], chunk_size) for i in range(num_workers)]
+        return sum(future.result() for future in futures)
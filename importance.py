@@ -0,0 +1,159 @@
+from itertools import combinations
+from criteria import CRITERIA, EvaluationContext, context_masks
+from ordertables import get_order_tables
+from samplers import Sampler, CustomSampler, IACSampler, make_sampler
+from sweep import mask_bits
+import numpy as np
+import math
+
+
+# importance sampling for violations that almost never happen under IC / IAC (Condorcet loser violations
+# of Instant Runoff and Coombs, majority violations of Borda with many voters, ...)
+# those violations come from schedules where two candidates are (nearly) tied, in their head to head or in first
+# place votes, and cycles only form when the head to heads are close, so the schedules are drawn from a mixture of
+# the usual distribution and the usual distribution conditioned on one such near tie (|count a - count b| <= width)
+# a component conditioned on a set T has density p(schedule) / P(T) inside T, so the weight of a schedule is
+#   p / q = 1 / (defensive + (1 - defensive) / K * sum over the K ties of [schedule in T_k] / P(T_k))
+# which needs no density of the schedule itself and is never above 1 / defensive
+class TieTiltedSampler(Sampler):
+    name = "TieTilted"
+
+    def __init__(self, num_voters, num_cands, distribution="IC", weights=None, width=0, defensive=0.5):
+        super().__init__(num_voters, num_cands)
+        params = {} if weights is None else {"weights": weights}
+        self.nominal = make_sampler(distribution, num_voters, num_cands, **params)
+        self.width = width
+        self.defensive = defensive
+        if isinstance(self.nominal, CustomSampler):
+            self.pvals = self.nominal.pvals
+        elif isinstance(self.nominal, IACSampler):
+            self.pvals = None
+        else:
+            self.pvals = np.full(self.poss_ranks, 1 / self.poss_ranks)
+        self.log_factorials = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, num_voters + self.poss_ranks)))])
+
+        # every tie is the groups of orders whose counts are compared (plus the orders left over) and the group
+        # totals inside the tie with their probabilities under the usual distribution
+        tables = get_order_tables(num_cands)
+        self.ties = []
+        for a, b in combinations(range(num_cands), 2):
+            self.add_tie([tables.pair_orders[(a, b)], tables.pair_orders[(b, a)]])
+            firsts = [np.flatnonzero(tables.orders[:, 0] == a), np.flatnonzero(tables.orders[:, 0] == b)]
+            self.add_tie(firsts + [np.flatnonzero((tables.orders[:, 0] != a) & (tables.orders[:, 0] != b))])
+
+    def parameters(self):
+        params = self.nominal.parameters()
+        params.update({"distribution": self.nominal.name, "width": self.width, "defensive": self.defensive})
+        return params
+
+    def add_tie(self, groups):
+        # with 2 candidates no order is left over, an empty group could only ever hold 0 voters
+        groups = [group for group in groups if len(group)]
+        totals = tie_totals(self.num_voters, len(groups), self.width)
+        probabilities = np.exp(self.log_total_probabilities(totals, groups))
+        # a tie that cannot happen (a head to head tie with an odd number of voters and width 0) is left out
+        if probabilities.sum() > 0:
+            self.ties.append((groups, totals, probabilities / probabilities.sum(), probabilities.sum()))
+
+    # log of the probability that the orders of each group add up to each row of totals
+    def log_total_probabilities(self, totals, groups):
+        log_factorials = self.log_factorials
+        if self.pvals is None:
+            # IAC: every schedule is equally likely, so count the schedules with those totals
+            sizes = np.array([len(group) for group in groups])
+            log_counts = log_factorials[totals + sizes - 1] - log_factorials[totals] - log_factorials[sizes - 1]
+            num_schedules = math.comb(self.num_voters + self.poss_ranks - 1, self.poss_ranks - 1)
+            return log_counts.sum(axis=1) - math.log(num_schedules)
+        group_pvals = np.array([self.pvals[group].sum() for group in groups])
+        with np.errstate(divide="ignore"):
+            log_pvals = np.log(group_pvals)
+        log_terms = np.where(totals > 0, totals * log_pvals, 0.0).sum(axis=1)
+        return log_factorials[self.num_voters] - log_factorials[totals].sum(axis=1) + log_terms
+
+    # given the group totals, the orders inside each group are drawn the way the usual distribution would
+    def fill_groups(self, schedules, totals, groups, rng):
+        for i, group in enumerate(groups):
+            if self.pvals is None:
+                proportions = rng.dirichlet(np.ones(len(group)), size=len(totals))
+            else:
+                group_pvals = self.pvals[group]
+                total = group_pvals.sum()
+                proportions = group_pvals / total if total > 0 else np.full(len(group), 1 / len(group))
+            schedules[:, group] = rng.multinomial(totals[:, i], proportions)
+        return schedules
+
+    # when no tie can happen (2 candidates and an odd number of voters) this is just the usual distribution
+    def sample(self, batch_size, rng):
+        if not self.ties:
+            return self.nominal.sample(batch_size, rng)
+        from_nominal = rng.random(batch_size) < self.defensive
+        schedules = np.zeros((batch_size, self.poss_ranks), dtype=np.int64)
+        schedules[from_nominal] = self.nominal.sample(int(from_nominal.sum()), rng)
+        tilted = np.flatnonzero(~from_nominal)
+        components = rng.integers(0, len(self.ties), size=len(tilted))
+        for k, (groups, totals, probabilities, _) in enumerate(self.ties):
+            rows = tilted[components == k]
+            picks = rng.choice(len(totals), size=len(rows), p=probabilities)
+            schedules[rows] = self.fill_groups(schedules[rows], totals[picks], groups, rng)
+        return schedules
+
+    # p(schedule) / q(schedule) for every schedule, p being the usual distribution and q this mixture
+    def likelihood_ratios(self, schedules):
+        if not self.ties:
+            return np.ones(len(schedules))
+        tilted = np.zeros(len(schedules))
+        for groups, _, _, probability in self.ties:
+            difference = schedules[:, groups[0]].sum(axis=1) - schedules[:, groups[1]].sum(axis=1)
+            tilted += (np.abs(difference) <= self.width) / probability
+        return 1 / (self.defensive + (1 - self.defensive) * tilted / len(self.ties))
+
+
+# every way of splitting num_voters into num_groups totals where the first two differ by at most width
+def tie_totals(num_voters, num_groups, width):
+    first = np.arange(num_voters + 1)
+    if num_groups == 2:
+        totals = np.column_stack([first, num_voters - first])
+    else:
+        first, difference = np.meshgrid(first, np.arange(-width, width + 1), indexing="ij")
+        first, second = first.ravel(), (first + difference).ravel()
+        totals = np.column_stack([first, second, num_voters - first - second])
+    return totals[(totals >= 0).all(axis=1) & (np.abs(totals[:, 0] - totals[:, 1]) <= width)]
+
+
+# estimates how often each system violates each criterion under distribution from num_trials schedules of the
+# tilted mixture, the estimate is the mean of weight * violated and its standard error comes from the spread
+# of those products, effective_trials is how many plain draws the weights are worth
+def importance_estimates(systems, distribution, num_trials, weights=None, criteria=CRITERIA, width=0,
+                         defensive=0.5, batch_size=1000, rng=None):
+    num_voters, num_cands = systems[0].num_voters, systems[0].num_cands
+    sampler = TieTiltedSampler(num_voters, num_cands, distribution, weights, width, defensive)
+    rng = systems[0].rng if rng is None else rng
+
+    # running sums of w * v and (w * v)^2 for every (system, criterion), and of w and w^2
+    totals = np.zeros((len(systems), len(criteria)))
+    squares = np.zeros((len(systems), len(criteria)))
+    weight_sum = 0.0
+    weight_squares = 0.0
+    remaining = num_trials
+    while remaining > 0:
+        batch = sampler.sample(min(batch_size, remaining), rng)
+        remaining -= len(batch)
+        ratios = sampler.likelihood_ratios(batch)
+        weight_sum += ratios.sum()
+        weight_squares += (ratios ** 2).sum()
+        context = EvaluationContext(systems[0], batch, rng)
+        for s, system in enumerate(systems):
+            context = context.for_system(system)
+            weighted = mask_bits(context_masks(context, criteria), len(criteria)) * ratios[:, None]
+            totals[s] += weighted.sum(axis=0)
+            squares[s] += (weighted ** 2).sum(axis=0)
+
+    results = {"trials": num_trials, "effective_trials": weight_sum ** 2 / weight_squares, "criteria": {}}
+    for s, system in enumerate(systems):
+        results["criteria"][system.type()] = {}
+        for c, criterion in enumerate(criteria):
+            estimate = totals[s, c] / num_trials
+            variance = max(squares[s, c] / num_trials - estimate ** 2, 0.0)
+            results["criteria"][system.type()][criterion] = {
+                "estimate": float(estimate), "std_error": math.sqrt(variance / num_trials)}
+    return results
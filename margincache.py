@@ -0,0 +1,50 @@
+from collections import OrderedDict
+import numpy as np
+
+
+# rankings of the systems that only depend on the pairwise margins (Minimax, Ranked Pairs, Black, Pairwise
+# Comparison), keyed on the margins above the diagonal and the number of voters (Black's Borda scores grow with it)
+# with few voters (and with the IIA resamples, which keep most head to heads as they were) many different
+# schedules have the same margins, so their ranking is only worked out once
+# holds at most maxsize rankings, the one used longest ago is dropped first
+class MarginCache:
+    def __init__(self, num_cands, maxsize=65536):
+        self.maxsize = maxsize
+        self.upper = np.triu_indices(num_cands, 1)
+        self.entries = OrderedDict()
+        self.hits = 0  # schedules whose ranking was already known
+        self.misses = 0  # schedules that had to be ranked
+        self.evictions = 0  # rankings dropped to stay within maxsize
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.entries)}
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    # the ranks and scores of every schedule, rank_and_score(schedules, pairwise) is only called for the margins
+    # (and voter totals) that are in neither the cache nor earlier in the batch
+    def rank_and_score(self, rank_and_score, schedules, pairwise):
+        margins = (pairwise - np.swapaxes(pairwise, 1, 2))[:, self.upper[0], self.upper[1]]
+        margins = np.column_stack([margins, schedules.sum(axis=1)]).astype(np.int32)
+        unique, first, inverse = np.unique(margins, axis=0, return_index=True, return_inverse=True)
+        keys = [row.tobytes() for row in unique]
+        results = [self.entries.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        for key, result in zip(keys, results):
+            if result is not None:
+                self.entries.move_to_end(key)
+        if missing:
+            rows = first[missing]
+            ranks, scores = rank_and_score(schedules[rows], pairwise[rows])
+            for i, rank, score in zip(missing, ranks, scores):
+                results[i] = (rank, score)
+                self.entries[keys[i]] = results[i]
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        self.misses += len(missing)
+        self.hits += len(schedules) - len(missing)
+        inverse = inverse.ravel()
+        return np.stack([ranks for ranks, _ in results])[inverse], np.stack([scores for _, scores in results])[inverse]
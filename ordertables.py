@@ -0,0 +1,177 @@
+from itertools import permutations
+import numpy as np
+import math
+
+
+# integer tables describing every possible preference order for a given number of candidates
+# the orders are listed in the same order itertools.permutations produces them, so row i here lines up with
+# VotingSystem.possible_orders[i] and with position i of every preference schedule
+class OrderTables:
+    def __init__(self, num_cands):
+        self.num_cands = num_cands
+        self.num_orders = 0
+
+        # orders[i][p] is the index of the candidate in position p of order i
+        # for instance with 3 candidates [[0,1,2],[0,2,1],[1,0,2],[1,2,0],[2,0,1],[2,1,0]]
+        self.orders = np.array(list(permutations(range(num_cands))), dtype=np.intp).reshape(-1, num_cands)
+        self.num_orders = len(self.orders)
+
+        # positions[i][c] is the position of candidate c in order i (the inverse of orders)
+        self.positions = np.argsort(self.orders, axis=1)
+
+        # pair_indicator[i][a * num_cands + b] is 1 if order i prefers candidate a over candidate b
+        # a schedule times this matrix gives every head to head tally at once
+        prefers = self.positions[:, :, None] < self.positions[:, None, :]
+        self.pair_indicator = prefers.reshape(self.num_orders, num_cands * num_cands).astype(np.int64)
+
+        # pair_orders[(a, b)] are the indices of the orders that rank candidate a above candidate b
+        # (the two entries of a pair split the orders into two halves)
+        self.pair_orders = {}
+        for a in range(num_cands):
+            for b in range(num_cands):
+                if a != b:
+                    self.pair_orders[(a, b)] = np.flatnonzero(self.positions[:, a] < self.positions[:, b])
+
+        self.score_matrices = {}
+        self.move_maps = {}
+        self.relabel_maps = None
+
+    # score_matrix[i][c] is the score order i gives candidate c when position p is worth position_scores[p]
+    # (positions past the end of position_scores are worth 0), cached per score vector
+    def score_matrix(self, position_scores):
+        key = tuple(position_scores)
+        matrix = self.score_matrices.get(key)
+        if matrix is None:
+            scores = np.zeros(self.num_cands, dtype=np.asarray(key).dtype)
+            scores[:len(key)] = key
+            matrix = scores[self.positions]
+            self.score_matrices[key] = matrix
+        return matrix
+
+    # move_map(c, amt, up, pair)[i] is the index of the order made by moving candidate c up (or down) amt places
+    # in order i, stopping at the top or bottom (the move_up / move_down of VotingSystem)
+    # when c is one of the pair (one, two) and the other one is right above it (right below when moving down)
+    # the order stays as it is so that the pair never swaps, cached per move
+    def move_map(self, cand, amt, up, pair):
+        key = (cand, amt, up, pair)
+        order_map = self.move_maps.get(key)
+        if order_map is None:
+            rows = np.arange(self.num_orders)
+            old = self.positions[:, cand]
+            step = -1 if up else 1
+            new = np.clip(old + step * amt, 0, self.num_cands - 1)
+            if cand in pair:
+                rival = pair[1] if cand == pair[0] else pair[0]
+                new = np.where(self.positions[:, rival] == old + step, old, new)
+            # the candidates between the old and the new spot shift one place the other way
+            positions = self.positions.copy()
+            if up:
+                positions += (self.positions >= new[:, None]) & (self.positions < old[:, None])
+            else:
+                positions -= (self.positions > old[:, None]) & (self.positions <= new[:, None])
+            positions[rows, cand] = new
+            order_map = order_ranks(np.argsort(positions, axis=1))
+            self.move_maps[key] = order_map
+        return order_map
+
+    # moves the voters of every order i of the schedule to order order_maps[k][i], for each of the k maps
+    # returns one new schedule per map (the voters of orders mapped to the same order are added up)
+    def remap_schedule(self, schedule, order_maps):
+        order_maps = np.atleast_2d(order_maps)
+        offsets = np.arange(len(order_maps))[:, None] * self.num_orders
+        weights = np.broadcast_to(schedule, order_maps.shape)
+        remapped = np.bincount((order_maps + offsets).ravel(), weights=weights.ravel(),
+                               minlength=len(order_maps) * self.num_orders)
+        return remapped.reshape(len(order_maps), self.num_orders).astype(np.asarray(schedule).dtype)
+
+    # relabelings()[k][i] is the index of order i after renaming every candidate c to orders[k][c]
+    # (one row per permutation of the candidates, built the first time it is needed)
+    def relabelings(self):
+        if self.relabel_maps is None:
+            renamed = self.orders[:, self.orders]  # renamed[k][i][p] = orders[k][orders[i][p]]
+            self.relabel_maps = order_ranks(renamed.reshape(-1, self.num_cands)).reshape(self.num_orders,
+                                                                                         self.num_orders)
+        return self.relabel_maps
+
+    # the representative of each schedule among all the schedules you get by renaming the candidates
+    # (the largest one in lexicographic order) and how many different schedules that renaming gives (orbit size)
+    # a neutral system gives the same results on every schedule of an orbit up to the renaming
+    def canonical_relabeling(self, schedules):
+        schedules = np.atleast_2d(schedules)
+        rows = np.arange(len(schedules))
+        # relabeled[:, relabel_maps[k][i]] = schedules[:, i], so relabeling k reads schedules through its inverse
+        inverse_maps = np.argsort(self.relabelings(), axis=1)
+        representatives = schedules[:, inverse_maps[0]]
+        stabilizers = np.ones(len(schedules), dtype=np.int64)  # renamings that give the representative
+        # one renaming at a time, keeping the lexicographically largest seen so far, so only two schedules
+        # per row are ever in memory
+        for inverse in inverse_maps[1:]:
+            relabeled = schedules[:, inverse]
+            differs = relabeled != representatives
+            first = np.argmax(differs, axis=1)
+            larger = differs.any(axis=1) & (relabeled[rows, first] > representatives[rows, first])
+            representatives[larger] = relabeled[larger]
+            stabilizers = np.where(larger, 1, stabilizers + ~differs.any(axis=1))
+        # the renamings that give the representative are the ones that leave the schedule alone
+        return representatives, self.num_orders // stabilizers
+
+    # computes the pairwise matrix of a schedule, pairwise[a][b] is the number of voters preferring a over b
+    # also works on a batch of schedules (num_trials x n!) and then returns num_trials pairwise matrices
+    def pairwise_matrix(self, schedules):
+        schedules = np.asarray(schedules)
+        flat = schedules @ self.pair_indicator
+        return flat.reshape(schedules.shape[:-1] + (self.num_cands, self.num_cands))
+
+
+# the tables only depend on the number of candidates, so they are built once and shared by every system
+_tables_by_num_cands = {}
+
+
+def get_order_tables(num_cands):
+    tables = _tables_by_num_cands.get(num_cands)
+    if tables is None:
+        tables = OrderTables(num_cands)
+        _tables_by_num_cands[num_cands] = tables
+    return tables
+
+
+# Lehmer code ranking of an order of candidate indices, in the order itertools.permutations lists the orders
+# (so it is the index of the order in possible_orders), order_rank((0, 2, 1)) is 1 and order_rank((2, 1, 0)) is 5
+# each position contributes how many of the candidates after it are smaller, in a factorial number system
+def order_rank(order):
+    num_cands = len(order)
+    index = 0
+    for p, cand in enumerate(order):
+        smaller_after = sum(1 for other in order[p + 1:] if other < cand)
+        index = index * (num_cands - p) + smaller_after
+    return index
+
+
+# the inverse of order_rank, order_unrank(1, 3) is [0, 2, 1]
+def order_unrank(index, num_cands):
+    remaining = list(range(num_cands))
+    order = []
+    for p in range(num_cands - 1, -1, -1):
+        digit, index = divmod(index, math.factorial(p))
+        order.append(remaining.pop(digit))
+    return order
+
+
+# order_rank for many orders at once, orders is a (num_orders x num_cands) array of candidate indices
+def order_ranks(orders):
+    orders = np.atleast_2d(orders)
+    num_cands = orders.shape[1]
+    later = np.triu(np.ones((num_cands, num_cands), dtype=bool), k=1)  # later[p][q] is True if q comes after p
+    digits = ((orders[:, :, None] > orders[:, None, :]) & later).sum(axis=2)
+    weights = np.array([math.factorial(num_cands - 1 - p) for p in range(num_cands)], dtype=np.int64)
+    return digits @ weights
+
+
+# turns a list of full ballots (each a sequence of candidate names, most preferred first) into a preference
+# schedule lined up with possible_orders, counts can give the number of voters casting each ballot
+def ballots_to_schedule(ballots, cand_names, counts=None):
+    name_to_index = {name: i for i, name in enumerate(cand_names)}
+    orders = np.array([[name_to_index[name] for name in ballot] for ballot in ballots], dtype=np.intp)
+    orders = orders.reshape(-1, len(cand_names))
+    return np.bincount(order_ranks(orders), weights=counts,
+                       minlength=math.factorial(len(cand_names))).astype(int)
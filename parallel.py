@@ -0,0 +1,58 @@
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import random as rand
+import numpy as np
+
+
+# the counter each find_* method fills in on the voting system
+COUNTERS = {
+    "find_condorcet_vios": "cwc_vio",
+    "find_condorcet_loser_vios": "clc_vio",
+    "find_IIA_violations": "IIAv",
+    "find_majority_violations": "majority_vio",
+    "find_unanimity_vios": "unam_vios",
+    "find_transitivity_vios": "transitivity_vio",
+    "find_joint_violations": "joint",
+}
+
+
+# runs one chunk of trials on a copy of the system and returns the counters it ended with
+# both numpy (for the schedules) and the random module (for tie breaks) are seeded from the chunk's own stream
+def run_chunk(system, method, num_trials, distribution, weights, seed_seq):
+    system = copy.deepcopy(system)
+    for counter in list(COUNTERS.values()) + ["condorcet_count"]:
+        setattr(system, counter, 0)
+    system.rng = np.random.default_rng(seed_seq)
+    rand.seed(int(seed_seq.generate_state(1)[0]))
+    getattr(system, method)(num_trials, distribution, weights)
+    return {COUNTERS[method]: getattr(system, COUNTERS[method]), "condorcet_count": system.condorcet_count}
+
+
+# splits num_trials into chunks of chunk_size and runs them over num_workers processes (None uses every core)
+# every chunk gets its own stream spawned from one SeedSequence, so for a given seed the counts do not depend
+# on the number of workers, only on the seed and the chunk size
+# the merged counters are written onto the system like the find_* method would and returned as a dict
+def run_parallel(system, method, num_trials, distribution, weights=None, seed=None, num_workers=None,
+                 chunk_size=1000):
+    if method not in COUNTERS:
+        raise ValueError(f"unknown method {method}, expected one of {list(COUNTERS)}")
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    chunks = [chunk_size] * (num_trials // chunk_size)
+    if num_trials % chunk_size:
+        chunks.append(num_trials % chunk_size)
+    streams = seed_seq.spawn(len(chunks))
+
+    args = [(system, method, trials, distribution, weights, stream) for trials, stream in zip(chunks, streams)]
+    if num_workers == 1 or len(args) <= 1:
+        results = [run_chunk(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            results = list(executor.map(run_chunk, *zip(*args)))
+
+    totals = {COUNTERS[method]: 0, "condorcet_count": 0}
+    for result in results:
+        for counter, count in result.items():
+            totals[counter] += count
+    for counter, count in totals.items():
+        setattr(system, counter, count)
+    return totals
@@ -0,0 +1,122 @@
+from abc import ABC, abstractmethod
+from distributions import generate_IC_batch, generate_IAC_batch
+import numpy as np
+import math
+
+
+# a sampler knows how to draw batches of preference schedules from one culture (IC, IAC, custom weights, ...)
+# the criteria loops in VotingSystem only ever call sample(), so a new culture only needs a new Sampler class
+class Sampler(ABC):
+    name = None
+    parameter_names = ()  # the keyword parameters the constructor takes besides num_voters and num_cands
+
+    def __init__(self, num_voters, num_cands):
+        self.num_voters = num_voters
+        self.num_cands = num_cands
+        self.poss_ranks = math.factorial(num_cands)
+
+    # the parameters the sampler was created with (for printing results and recreating the sampler)
+    def parameters(self):
+        return {"num_voters": self.num_voters, "num_cands": self.num_cands}
+
+    # returns a (batch_size x num_cands!) array of preference schedules, rng is a numpy.random.Generator
+    @abstractmethod
+    def sample(self, batch_size, rng):
+        pass
+
+
+# maps the distribution names used by the find_*_vios methods to their sampler classes
+SAMPLERS = {}
+
+
+def register_sampler(sampler_class):
+    SAMPLERS[sampler_class.name] = sampler_class
+    return sampler_class
+
+
+# creates the sampler for a distribution name, a sampler object that is passed in is returned as is
+# only the parameters the sampler declares are passed on, so like before weights are ignored for IC and IAC
+def make_sampler(distribution, num_voters, num_cands, **params):
+    if isinstance(distribution, Sampler):
+        return distribution
+    if distribution not in SAMPLERS:
+        raise ValueError(f"unknown distribution {distribution}, expected one of {list(SAMPLERS)}")
+    sampler_class = SAMPLERS[distribution]
+    params = {name: value for name, value in params.items() if name in sampler_class.parameter_names}
+    return sampler_class(num_voters, num_cands, **params)
+
+
+@register_sampler
+class ICSampler(Sampler):
+    name = "IC"
+
+    def sample(self, batch_size, rng):
+        return generate_IC_batch(batch_size, self.num_voters, self.num_cands, rng)
+
+
+@register_sampler
+class IACSampler(Sampler):
+    name = "IAC"
+
+    def sample(self, batch_size, rng):
+        return generate_IAC_batch(batch_size, self.num_voters, self.num_cands, rng)
+
+
+@register_sampler
+class CustomSampler(Sampler):
+    name = "Custom"
+    parameter_names = ("weights",)
+
+    def __init__(self, num_voters, num_cands, weights):
+        super().__init__(num_voters, num_cands)
+        self.weights = list(weights)
+        if len(self.weights) != self.poss_ranks:
+            raise ValueError(f"expected one weight per order ({self.poss_ranks}), got {len(self.weights)}")
+        # the weights are preprocessed once here instead of rebuilding a cumulative list on every schedule
+        pvals = np.asarray(self.weights, dtype=float)
+        self.pvals = pvals / pvals.sum()
+        self.alias_prob, self.alias = build_alias_table(self.pvals)
+
+    def parameters(self):
+        params = super().parameters()
+        params["weights"] = self.weights
+        return params
+
+    def sample(self, batch_size, rng):
+        # a multinomial draw costs about the same for any number of voters but has to go through every order,
+        # so with fewer voters than orders it is cheaper to draw each voter from the alias table
+        if self.num_voters >= self.poss_ranks:
+            return rng.multinomial(self.num_voters, self.pvals, size=batch_size)
+        choices = alias_draw(self.alias_prob, self.alias, (batch_size, self.num_voters), rng)
+        # counts the choices of each trial separately by offsetting every row into its own range of bins
+        offsets = np.arange(batch_size)[:, None] * self.poss_ranks
+        counts = np.bincount((choices + offsets).ravel(), minlength=batch_size * self.poss_ranks)
+        return counts.reshape(batch_size, self.poss_ranks)
+
+
+# Vose's alias method, after this one uniform index and one coin flip pick an outcome with probability pvals[i]
+def build_alias_table(pvals):
+    num = len(pvals)
+    scaled = np.asarray(pvals, dtype=float) * num
+    alias_prob = np.ones(num)
+    alias = np.arange(num)
+    small = [i for i in range(num) if scaled[i] < 1]
+    large = [i for i in range(num) if scaled[i] >= 1]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        alias_prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] = scaled[more] + scaled[less] - 1
+        if scaled[more] < 1:
+            small.append(more)
+        else:
+            large.append(more)
+    # whatever is left over only differs from 1 by rounding error
+    return alias_prob, alias
+
+
+def alias_draw(alias_prob, alias, size, rng):
+    picks = rng.integers(0, len(alias_prob), size=size)
+    keep = rng.random(size) < alias_prob[picks]
+    return np.where(keep, picks, alias[picks])
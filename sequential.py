@@ -0,0 +1,111 @@
+from statistics import NormalDist
+from criteria import CRITERIA, EvaluationContext, context_masks
+from parallel import COUNTERS
+from samplers import make_sampler
+from sweep import mask_bits
+import numpy as np
+import math
+import time
+
+
+# runners that keep drawing batches of schedules until the violation rates are known well enough,
+# instead of running a fixed num_trials
+# they stop when every Wilson interval is at most half_width on each side of its estimate, when max_seconds
+# have gone by or when max_trials schedules were checked, whichever comes first
+# any of the three can be None to leave it out, but at least one has to be given
+
+
+# the Wilson score interval for violations out of trials
+def wilson_interval(violations, trials, confidence=0.95):
+    if trials == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rate = violations / trials
+    center = (rate + z * z / (2 * trials)) / (1 + z * z / trials)
+    spread = z / (1 + z * z / trials) * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials))
+    return max(center - spread, 0.0), min(center + spread, 1.0)
+
+
+def half_width(violations, trials, confidence=0.95):
+    low, high = wilson_interval(violations, trials, confidence)
+    return (high - low) / 2
+
+
+def check_limits(half_width_target, max_seconds, max_trials):
+    if half_width_target is None and max_seconds is None and max_trials is None:
+        raise ValueError("the run needs at least one of half_width_target, max_seconds or max_trials")
+
+
+# what made the run stop, None while it should keep going
+def stop_reason(widths, half_width_target, trials, max_trials, start, max_seconds):
+    if half_width_target is not None and max(widths) <= half_width_target:
+        return "half_width"
+    if max_trials is not None and trials >= max_trials:
+        return "max_trials"
+    if max_seconds is not None and time.monotonic() - start >= max_seconds:
+        return "max_seconds"
+    return None
+
+
+def interval_result(violations, trials, confidence):
+    violations = int(violations)
+    low, high = wilson_interval(violations, trials, confidence)
+    return {"violations": violations, "rate": violations / trials if trials else 0.0, "interval": (low, high)}
+
+
+# runs any of the find_* methods (see parallel.COUNTERS) batch_size trials at a time until its counter is known
+# to within half_width, the total is written to the counter like the find_* method would
+def run_sequential(system, method, distribution, weights=None, half_width_target=0.01, confidence=0.95,
+                   max_seconds=None, max_trials=None, batch_size=1000):
+    if method not in COUNTERS:
+        raise ValueError(f"unknown method {method}, expected one of {list(COUNTERS)}")
+    check_limits(half_width_target, max_seconds, max_trials)
+    counter = COUNTERS[method]
+    start = time.monotonic()
+    trials = 0
+    violations = 0
+    reason = None
+    while reason is None:
+        num_trials = batch_size if max_trials is None else min(batch_size, max_trials - trials)
+        setattr(system, counter, 0)
+        getattr(system, method)(num_trials, distribution, weights)
+        violations += getattr(system, counter)
+        trials += num_trials
+        reason = stop_reason([half_width(violations, trials, confidence)], half_width_target, trials, max_trials,
+                             start, max_seconds)
+    setattr(system, counter, violations)
+    result = interval_result(violations, trials, confidence)
+    result.update({"trials": trials, "stopped_by": reason})
+    return result
+
+
+# the same for every (system, criterion) at once: the systems are checked on the same schedules (see
+# sweep.compare_systems) and the run goes on until the widest interval of them all is narrow enough
+def run_criteria_sequential(systems, distribution, weights=None, criteria=CRITERIA, half_width_target=0.01,
+                            confidence=0.95, max_seconds=None, max_trials=None, batch_size=1000, rng=None):
+    check_limits(half_width_target, max_seconds, max_trials)
+    num_voters, num_cands = systems[0].num_voters, systems[0].num_cands
+    params = {} if weights is None else {"weights": weights}
+    sampler = make_sampler(distribution, num_voters, num_cands, **params)
+    rng = systems[0].rng if rng is None else rng
+    start = time.monotonic()
+    trials = 0
+    vios = np.zeros((len(systems), len(criteria)), dtype=np.int64)
+    reason = None
+    while reason is None:
+        num_trials = batch_size if max_trials is None else min(batch_size, max_trials - trials)
+        batch = sampler.sample(num_trials, rng)
+        context = EvaluationContext(systems[0], batch, rng)
+        for s, system in enumerate(systems):
+            context = context.for_system(system)
+            masks = context_masks(context, criteria)
+            vios[s] += mask_bits(masks, len(criteria)).sum(axis=0)
+        trials += num_trials
+        widths = [half_width(v, trials, confidence) for v in vios.ravel()]
+        reason = stop_reason(widths, half_width_target, trials, max_trials, start, max_seconds)
+
+    results = {"trials": trials, "stopped_by": reason, "criteria": {}}
+    for s, system in enumerate(systems):
+        results["criteria"][system.type()] = {criterion: interval_result(vios[s, c], trials, confidence)
+                                              for c, criterion in enumerate(criteria)}
+    return results
@@ -0,0 +1,88 @@
+from itertools import combinations
+from candidate import Candidate
+from criteria import CRITERIA, EvaluationContext, context_masks
+from samplers import make_sampler
+import random as rand
+import numpy as np
+import math
+
+
+# runs every system on the same schedules (common random numbers): each batch is drawn once, its pairwise
+# matrices and first place votes are computed once, and every system is checked against it
+# systems can be VotingSystem classes (built with candidates A, B, C, ...), (class, keyword arguments) pairs for
+# classes that take more, like (TruncatedBorda, {"num_rank": 2}), or systems that were already made
+# the differences between two systems are paired per schedule, so they vary much less than with separate runs
+def compare_systems(systems, num_voters, num_cands, num_trials, distribution, weights=None, criteria=CRITERIA,
+                    seed=None, batch_size=1000):
+    systems = [make_system(system, num_voters, num_cands) for system in systems]
+    names = [system.type() for system in systems]
+    params = {} if weights is None else {"weights": weights}
+    sampler = make_sampler(distribution, num_voters, num_cands, **params)
+    # the systems' own tie breaks use the same generator so that a seed reproduces the whole sweep
+    # the systems' generators and the state of random are put back afterwards, so the caller's are left as they were
+    rng = np.random.default_rng(seed)
+    saved_rngs = [system.rng for system in systems]
+    saved_state = rand.getstate()
+    for system in systems:
+        system.rng = rng
+    if seed is not None:
+        rand.seed(seed)
+
+    # vios[s][c] counts the schedules where system s violates criterion c
+    # both[s][u][c] counts the schedules where systems s and u both violate it
+    vios = np.zeros((len(systems), len(criteria)), dtype=np.int64)
+    both = np.zeros((len(systems), len(systems), len(criteria)), dtype=np.int64)
+    remaining = num_trials
+    try:
+        while remaining > 0:
+            batch = sampler.sample(min(batch_size, remaining), rng)
+            remaining -= len(batch)
+            context = EvaluationContext(systems[0], batch, rng)
+            bits = []
+            for system in systems:
+                # each context hands on what the earlier systems already computed for this batch
+                context = context.for_system(system)
+                bits.append(mask_bits(context_masks(context, criteria), len(criteria)))
+            bits = np.stack(bits)
+            vios += bits.sum(axis=1)
+            both += np.einsum("stc,utc->suc", bits, bits)
+    finally:
+        for system, saved_rng in zip(systems, saved_rngs):
+            system.rng = saved_rng
+        rand.setstate(saved_state)
+
+    results = {"num_trials": num_trials, "criteria": list(criteria), "systems": names,
+               "violations": {name: dict(zip(criteria, vios[s].tolist())) for s, name in enumerate(names)},
+               "paired": {}}
+    for s, u in combinations(range(len(systems)), 2):
+        results["paired"][(names[s], names[u])] = {
+            criterion: paired_difference(vios[s, c], vios[u, c], both[s, u, c], num_trials)
+            for c, criterion in enumerate(criteria)}
+    return results
+
+
+def make_system(system, num_voters, num_cands, **params):
+    if isinstance(system, tuple):
+        system, extra = system
+        params = {**extra, **params}
+    if isinstance(system, type):
+        return system(num_voters, num_cands, [Candidate(chr(ord("A") + i)) for i in range(num_cands)], **params)
+    return system
+
+
+# (num_trials x k) 0/1 array of which criteria each mask has
+def mask_bits(masks, num_criteria):
+    return (masks[:, None] >> np.arange(num_criteria)) & 1
+
+
+# the difference in violation rate between two systems on the same schedules and its standard error
+# only the schedules where exactly one of the two violates (the discordant pairs) add to the variance
+def paired_difference(first, second, both, num_trials):
+    only_first = int(first - both)
+    only_second = int(second - both)
+    if num_trials == 0:
+        return {"difference": 0.0, "std_error": 0.0, "only_first": 0, "only_second": 0}
+    difference = (only_first - only_second) / num_trials
+    variance = (only_first + only_second) / num_trials - difference ** 2
+    return {"difference": difference, "std_error": math.sqrt(max(variance, 0) / num_trials),
+            "only_first": only_first, "only_second": only_second}
@@ -1,31 +1,85 @@
 from votingsystemclass import VotingSystem
+from engines import positional_scores, dense_ranks, ranked_pairs_order, ranked_pairs_ranks, strongest_paths
+from engines import elimination_rounds, coombs_majority_rounds, PAIRWISE_ROUNDS
+from engines import instant_runoff_round, coombs_round, baldwin_round, nanson_round
+from tournaments import get_tournament_table
+from abc import abstractmethod
 import random as rand
-from collections import deque
-from itertools import combinations
-
-class Plurality(VotingSystem):
+import numpy as np
+import math
+
+# base class for the positional scoring systems (Plurality, Anti-Plurality, Borda, Truncated Borda, Dowdall)
+# a system only has to say what each position in an order is worth, the scoring is one matrix product
+# score_attribute is the Candidate member the score is written to
+class PositionalSystem(VotingSystem):
+    uses_pairwise = False
+    score_attribute = "points"
+    counts_first_place = False  # also keep the first place votes in num_votes
+    score_scale = 1  # the scores are divided by this before being written to the candidates
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
 
-    # this function takes in a preference schedule (list of numbers of length factorial(num_cands) and computes the winner
+    # what a voter gives the candidate in each position of their order
+    @abstractmethod
+    def position_scores(self):
+        pass
+
+    # one (integer) score per candidate
+    def candidate_scores(self, pref_schedule, poss_order):
+        schedule = self.canonical_schedule(pref_schedule, poss_order)
+        if schedule is None:
+            return np.array(self.score_by_position(pref_schedule, poss_order, self.position_scores()))
+        return positional_scores(schedule, self.order_tables.score_matrix(self.position_scores()))
+
+    # scores a whole batch of schedules (num_trials x n!) at once
+    def score_schedules(self, schedules):
+        return positional_scores(schedules, self.order_tables.score_matrix(self.position_scores()))
+
+    def rank_and_score(self, schedules, pairwise=None):
+        scores = self.score_schedules(schedules)
+        return dense_ranks(scores), scores if self.score_scale == 1 else scores / self.score_scale
 
     def set_votes(self, pref_schedule, poss_order):
-        # setting all candidate votes to 0
-        for cand in self.cand_objects:
-            cand.num_votes = 0
-        count = 0
-        # for each value in the preference schedule
-        for val in pref_schedule:
-            # the first one is the one getting votes
-            name_of_cand_getting_votes = poss_order[count][0]
-            # using find candidate with name function here
-            cand_get_votes = self.find_which_candidate_w_name(name_of_cand_getting_votes)
-            cand_get_votes.num_votes += val
-            count += 1
+        self.store_scores(self.candidate_scores(pref_schedule, poss_order), pref_schedule, poss_order)
+
+    def store_scores(self, scores, pref_schedule, poss_order):
+        for cand, score in zip(self.cand_objects, scores.tolist()):
+            setattr(cand, self.score_attribute, score if self.score_scale == 1 else score / self.score_scale)
+        if self.counts_first_place:
+            # for consistency
+            first_votes = self.tally_by_index(self.first_choices(poss_order), pref_schedule)
+            for cand, votes in zip(self.cand_objects, first_votes):
+                cand.num_votes = votes
+
+    # IIA is decided exactly instead of with random schedules: with the same relative ranking of a pair,
+    # a voter preferring a over b adds between min and max of s[i] - s[j] (i < j, s the position scores)
+    # to the score of a minus the score of b, so the difference over all such schedules ranges from
+    # one_c * min - two_c * max to one_c * max - two_c * min and a flip exists if that range allows it
+    def violates_IIA(self, pref_schedule):
+        context = self.evaluation_context(pref_schedule)
+        return bool(self.IIA_violations(context.pairwise, context.ranks)[0])
+
+    # the exact IIA check for a batch, from the pairwise matrices and the ranks of the schedules
+    def IIA_violations(self, pairwise, ranks):
+        scores = np.zeros(self.num_cands, dtype=np.int64)
+        scores[:len(self.position_scores())] = self.position_scores()
+        earlier, later = np.triu_indices(self.num_cands, k=1)
+        smallest = (scores[earlier] - scores[later]).min()
+        largest = (scores[earlier] - scores[later]).max()
+
+        one, two = np.triu_indices(self.num_cands, k=1)
+        one_c = pairwise[:, one, two]
+        two_c = pairwise[:, two, one]
+        lowest = one_c * smallest - two_c * largest
+        highest = one_c * largest - two_c * smallest
+        one_r = ranks[:, one]
+        two_r = ranks[:, two]
+        flips = (((one_r < two_r) & (lowest <= 0)) | ((one_r > two_r) & (highest >= 0))
+                 | ((one_r == two_r) & ((lowest < 0) | (highest > 0))))
+        return flips.any(axis=1)
 
     def determine_winner(self, pref_schedule, cand_obj, poss_order):
-
         societal_order = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
         num_top = len(societal_order[0])
         if (num_top == 1):
@@ -37,76 +91,40 @@ class Plurality(VotingSystem):
             return None
 
     def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
-        self.set_votes(pref_schedule, poss_order)
-        sorted_list = sorted(cand_obj, key=lambda v: v.num_votes, reverse=True)
-        map_of_cands = {}
-        # emulates do while
-        count = 0
-        previous = sorted_list[0].num_votes
-        map_of_cands[count] = []
-        # end of first iteration
-        for cand in sorted_list:
-            if (cand.num_votes == previous):
-                map_of_cands[count].append(cand)
-            else:
-                count += 1
-                map_of_cands[count] = []
-                map_of_cands[count].append(cand)
-            previous = cand.num_votes
-            cand.rank = count
-
+        scores = self.candidate_scores(pref_schedule, poss_order)
+        self.store_scores(scores, pref_schedule, poss_order)
+        # only the candidates in cand_obj are ranked (ties keep the order of cand_obj)
+        ranks = dense_ranks([scores[self.name_to_index[cand.name]] for cand in cand_obj])
+        map_of_cands = {rank: [] for rank in range(ranks.max() + 1)}
+        for cand, rank in zip(cand_obj, ranks.tolist()):
+            map_of_cands[rank].append(cand)
+            cand.rank = rank
         return map_of_cands
 
-    def type(self):
-        return "Plurality"
-
-
 
-class AntiPlurality(VotingSystem):
+class Plurality(PositionalSystem):
+    score_attribute = "num_votes"
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
 
-    def set_votes(self, pref_schedule, poss_order):
-        for cand in self.cand_objects:
-            cand.points = 0
+    # the first choice of each order gets all the votes of that order
+    def position_scores(self):
+        return [1]
 
-        for i in range(len(pref_schedule)):
-            ordering = poss_order[i]
-            for j in range(0, self.num_cands):
-                if j < self.num_cands - 1:
-                    cand = self.find_which_candidate_w_name(ordering[j])
-                    cand.points += pref_schedule[i]
+    def type(self):
+        return "Plurality"
 
-    def determine_winner(self, pref_schedule, cand_obj, poss_order):
-        societal_order = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
-        num_top = len(societal_order[0])
-        if num_top == 1:
-            return societal_order[0][0]
-        elif num_top > 1:
-            cand_win = rand.choice(societal_order[0])
-            return cand_win
-        else:
-            return None
 
-    def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
-        self.set_votes(pref_schedule, poss_order)
-        sorted_list = sorted(cand_obj, key=lambda v: v.points, reverse=True)
-        map_of_cands = {}
-        count = 0
-        previous = sorted_list[0].points
-        map_of_cands[count] = []
-        for cand in sorted_list:
-            if cand.points == previous:
-                map_of_cands[count].append(cand)
-            else:
-                count += 1
-                map_of_cands[count] = []
-                map_of_cands[count].append(cand)
-            previous = cand.points
-            cand.rank = count
 
-        return map_of_cands
+class AntiPlurality(PositionalSystem):
+
+    def __init__(self, num_voters, num_cands, cand_objects):
+        super().__init__(num_voters, num_cands, cand_objects)
+
+    # one point for every position except the last one
+    def position_scores(self):
+        return [1] * (self.num_cands - 1)
 
     def type(self):
         return "Anti-Plurality"
@@ -114,176 +132,78 @@ class AntiPlurality(VotingSystem):
 
 
 
-class BordaCount(VotingSystem):
+class BordaCount(PositionalSystem):
+    counts_first_place = True
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
 
-    def set_votes(self, pref_schedule, poss_order):
-        for cand in self.cand_objects:
-            cand.points = 0
-            cand.num_votes = 0
-
-        count = 0
-        for val in pref_schedule:
-            ordering = poss_order[count]
-            # this could cause error is poss_order has eliminated cands (made change in other systems)
-            for i in range(0, self.num_cands):
-                if (i == 0):
-                    cand = self.find_which_candidate_w_name(ordering[0])
-                    cand.num_votes += val
-                # for consistency
-                cand = self.find_which_candidate_w_name(ordering[i])
-                cand.points += val * (self.num_cands - i)
-            count += 1
-
-    # this function takes in a preference schedule (list of numbers of length factorial(num_cands) and computes the winner
-    def determine_winner(self, pref_schedule, cand_obj, poss_order):
-
-        societal_order = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
-        num_top = len(societal_order[0])
-        if (num_top == 1):
-            return societal_order[0][0]
-        elif num_top > 1:
-            cand_win = rand.choice(societal_order[0])
-            return cand_win
-        else:
-            return None
-
-    def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
-        self.set_votes(pref_schedule, poss_order)
-        sorted_list = sorted(cand_obj, key=lambda v: v.points, reverse=True)
-        map_of_cands = {}
-        # emulates do while
-        count = 0
-        previous = sorted_list[0].points
-        map_of_cands[count] = []
-        # end of first iteration
-        for cand in sorted_list:
-            if (cand.points == previous):
-                map_of_cands[count].append(cand)
-            else:
-                count += 1
-                map_of_cands[count] = []
-                map_of_cands[count].append(cand)
-            previous = cand.points
-            cand.rank = count
-
-        return map_of_cands
+    # num_cands points for first place, num_cands - 1 for second, etc.
+    def position_scores(self):
+        return list(range(self.num_cands, 0, -1))
 
     def type(self):
         return "Borda Count"
 
 
-class TruncatedBorda(VotingSystem):
+class TruncatedBorda(PositionalSystem):
+    counts_first_place = True
 
     def __init__(self, num_voters, num_cands, cand_objects, num_rank):
         super().__init__(num_voters, num_cands, cand_objects)
         self.num_rank = num_rank
 
-    def set_votes(self, pref_schedule, poss_order):
-        for cand in self.cand_objects:
-            cand.points = 0
-            cand.num_votes = 0
-
-        count = 0
-        for val in pref_schedule:
-            ordering = poss_order[count]
-            for i in range(0, self.num_rank):
-                if (i == 0):
-                    cand = self.find_which_candidate_w_name(ordering[0])
-                    cand.num_votes += val
-                # for consistency
-                cand = self.find_which_candidate_w_name(ordering[i])
-                cand.points += val * (self.num_rank - i)
-            count += 1
-
-    # this function takes in a preference schedule (list of numbers of length factorial(num_cands) and computes the winner
-    def determine_winner(self, pref_schedule, cand_obj, poss_order):
-
-        societal_order = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
-        num_top = len(societal_order[0])
-        if (num_top == 1):
-            return societal_order[0][0]
-        elif num_top > 1:
-            cand_win = rand.choice(societal_order[0])
-            return cand_win
-        else:
-            return None
-
-    def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
-        self.set_votes(pref_schedule, poss_order)
-        sorted_list = sorted(cand_obj, key=lambda v: v.points, reverse=True)
-        map_of_cands = {}
-        # emulates do while
-        count = 0
-        previous = sorted_list[0].points
-        map_of_cands[count] = []
-        # end of first iteration
-        for cand in sorted_list:
-            if (cand.points == previous):
-                map_of_cands[count].append(cand)
-            else:
-                count += 1
-                map_of_cands[count] = []
-                map_of_cands[count].append(cand)
-            previous = cand.points
-            cand.rank = count
-
-        return map_of_cands
+    # only the first num_rank positions get points
+    def position_scores(self):
+        return list(range(self.num_rank, 0, -1))
 
     def type(self):
         return "Truncated Borda Count"
 
 
-class InstantRunoff(VotingSystem):
+# base class for the systems that eliminate candidates round by round (Instant Runoff, Coombs, Baldwin, Nanson)
+# the rounds run in engines.elimination_rounds on the fixed order table with a mask of eliminated candidates,
+# round_rule is the engine function for one round and score_attribute is where the last round's scores go
+class EliminationSystem(VotingSystem):
+    round_rule = None
+    score_attribute = "num_votes"
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
         self.candidates_remaining = self.cand_objects[:]
         self.current_pref_table = self.possible_orders[:]
         self.elec_round = 1
+        self.uses_pairwise = self.round_rule in PAIRWISE_ROUNDS
 
-    # takes the same function as plurality
-    def set_votes(self, pref_schedule, poss_order):
-        # setting all candidate votes to 0
-        for cand in self.cand_objects:
-            cand.num_votes = 0
-        count = 0
-        # for each value in the preference schedule
-        for val in pref_schedule:
-            # the first one is the one getting votes
-            name_of_cand_getting_votes = poss_order[count][0]
-            # using find candidate with name function here
-            cand_get_votes = self.find_which_candidate_w_name(name_of_cand_getting_votes)
-            cand_get_votes.num_votes += val
-            count += 1
-
+    # runs the election to the end: sets round_elim of the candidates in cand_obj (starting at self.elec_round),
+    # empties cand_obj like the eliminations used to and leaves the scores of the final round on the candidates
     def run_election(self, pref_schedule, cand_obj, poss_order):
-
-        if (len(cand_obj) == 0):
-            return
-        else:
-            self.set_votes(pref_schedule, poss_order)
-            cands_to_elim = self.find_candidates_with_lowest(cand_obj)
-            for cand in cands_to_elim:
-                cand.round_elim = self.elec_round
-                poss_order = self.eliminate_cands(poss_order, cand.name)
-                cand_obj.remove(cand)
-            self.elec_round += 1
-            self.run_election(pref_schedule, cand_obj, poss_order)
-
-    def find_candidates_with_lowest(self, cand_obj):
-        cands_with_least_votes = []
-        # this gets the candidates with the minimum votes and then take the votes of that candidate
-        # a better way to do that may be to sort them and take the 0th ones votes
-        # that may also save time
-        cand_with_min = min(cand_obj, key=lambda v: v.num_votes)
-        least_vote = cand_with_min.num_votes
+        schedule, missing = self.padded_schedule(pref_schedule, poss_order)
+        pairwise = self.pairwise_tally(pref_schedule, poss_order) if self.round_rule in PAIRWISE_ROUNDS else None
+        # candidates still in the orders but not in cand_obj keep their votes and are never eliminated
+        kept = ~missing
+        kept[[self.name_to_index[cand.name] for cand in cand_obj]] = False
+        round_elim, final_scores = elimination_rounds(schedule, self.order_tables, self.round_rule, missing, pairwise,
+                                                      kept)
+        round_elim = round_elim[0]
         for cand in cand_obj:
-            if cand.num_votes == least_vote:
-                cands_with_least_votes.append(cand)
-        return cands_with_least_votes
+            cand.round_elim = int(round_elim[self.name_to_index[cand.name]]) + self.elec_round - 1
+        self.elec_round += int(round_elim.max())
+        cand_obj.clear()
+        self.store_scores(final_scores[0])
+
+    def store_scores(self, scores):
+        for cand, score in zip(self.cand_objects, scores.tolist()):
+            setattr(cand, self.score_attribute, score)
+
+    # round_elim for a whole batch of schedules (num_trials x n!)
+    def round_schedules(self, schedules, pairwise=None):
+        return elimination_rounds(schedules, self.order_tables, self.round_rule, pairwise=pairwise)[0]
+
+    # the candidates eliminated last are ranked first, the score is the round a candidate went out in
+    def rank_and_score(self, schedules, pairwise=None):
+        round_elim = self.round_schedules(schedules, pairwise)
+        return dense_ranks(round_elim), round_elim
 
     def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
         cand_process = cand_obj[:]
@@ -320,125 +240,58 @@ class InstantRunoff(VotingSystem):
         else:
             return None
 
+
+class InstantRunoff(EliminationSystem):
+    # the candidates with the fewest first place votes are eliminated each round
+    round_rule = staticmethod(instant_runoff_round)
+
+    def __init__(self, num_voters, num_cands, cand_objects):
+        super().__init__(num_voters, num_cands, cand_objects)
+
+    # takes the same function as plurality
+    def set_votes(self, pref_schedule, poss_order):
+        # the first choice of each order gets all the votes of that order
+        first_votes = self.tally_by_index(self.first_choices(poss_order), pref_schedule)
+        for cand, votes in zip(self.cand_objects, first_votes):
+            cand.num_votes = votes
+
     def type(self):
         return "Instant Runoff"
 
 
-class Coombs(VotingSystem):
+class Coombs(EliminationSystem):
+    # the candidates with the most last place votes are eliminated each round
+    round_rule = staticmethod(coombs_round)
+    score_attribute = "last_place_votes"
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
-        self.candidates_remaining = self.cand_objects[:]
-        self.current_pref_table = self.possible_orders[:]
-        self.elec_round = 1
 
     # takes the same function as plurality
     def set_votes(self, pref_schedule, poss_order):
-        temp_num_cands = len(poss_order[0])
-        # setting all candidate votes to 0
-        for cand in self.cand_objects:
-            cand.last_place_votes = 0
-        count = 0
-        # for each value in the preference schedule
-        for val in pref_schedule:
-            # the first one is the one getting votes
-            name_of_cand_getting_last_votes = poss_order[count][temp_num_cands - 1]
-            # using find candidate with name function here
-            cand_get_votes = self.find_which_candidate_w_name(name_of_cand_getting_last_votes)
-            cand_get_votes.last_place_votes += val
-            count += 1
-
-    def run_election(self, pref_schedule, cand_obj, poss_order):
-
-        if (len(cand_obj) == 0):
-            return
-        else:
-            self.set_votes(pref_schedule, poss_order)
-            cands_to_elim = self.find_candidates_with_highest_last(cand_obj)
-            for cand in cands_to_elim:
-                cand.round_elim = self.elec_round
-                poss_order = self.eliminate_cands(poss_order, cand.name)
-                cand_obj.remove(cand)
-            self.elec_round += 1
-            self.run_election(pref_schedule, cand_obj, poss_order)
+        # the last choice of each order gets all the last place votes of that order
+        last_votes = self.tally_by_index(self.last_choices(poss_order), pref_schedule)
+        for cand, votes in zip(self.cand_objects, last_votes):
+            cand.last_place_votes = votes
 
     # this is my custom function to determine the ordering of Coombs with majority
     # winner need a majority to win a round and candidates are eliminates until majority winner(s) are reached
     # there can be multiple in case of 50/50 split
     # then we eliminate that candidate since they already won and we go again with the rest
-    # if at any time cand_obj is empty it means multiple were deleted at once - return
+    # if everyone left is eliminated at once they all get that round and the election stops
+    # the rounds run in engines.coombs_majority_rounds, cand_win is who can still win (cand_obj starts the same)
+    # candidates that never get a round keep their previous round_win
     def run_election_majority(self, pref_schedule, cand_obj, cand_win, poss_order, poss_order_win):
-        # if all objects from cand_win are removed - each allocated majority
-        if (len(cand_win) == 0):
-            return
-        else:
-            # if everyone is deleted then we need to exit this run
-            if (len(cand_obj) == 0):
-                return
-
-            self.set_votes(pref_schedule, poss_order)  # last place votes
-            # includes all cands who have most last place votes
-            cands_to_elim = self.find_candidates_with_highest_last(cand_obj)
-            self.simple_set(pref_schedule, poss_order)
-            cand_w_fifty_or_more = []
-            for cand in cand_obj:
-                if cand.num_votes >= self.num_voters / 2:
-                    cand_w_fifty_or_more.append(cand)
-            # if there are candidate(s) with at least 50% of the vote they win in that round
-            if len(cand_w_fifty_or_more) != 0:
-                for cand in cand_w_fifty_or_more:
-                    cand.round_win = self.elec_round
-                    poss_order_win = self.eliminate_cands(poss_order_win, cand.name)
-                    cand_win.remove(cand)
-                self.elec_round += 1  # round goes to the next one
-                # if there is a majority candidate, reset cand_obj and poss_order and go to next round
-                cand_obj = cand_win[:]
-                poss_order = poss_order_win[:]
-                # recursively calls run_election
-                self.run_election_majority(pref_schedule, cand_obj, cand_win, poss_order, poss_order_win)
-
-            else:
-                for cand in cands_to_elim:
-                    poss_order = self.eliminate_cands(poss_order, cand.name)
-                    cand_obj.remove(cand)
-                # if every single candidate is to be eliminated then we assign each one this round
-                # this is the round they were elected winner - exit the election since not possible to proceed
-                if (len(cand_obj) == 0):
-                    for cand in cands_to_elim:
-                        cand.round_win = self.elec_round
-                self.run_election_majority(pref_schedule, cand_obj, cand_win, poss_order, poss_order_win)
-
-    def find_candidates_with_highest_last(self, cand_obj):
-        cands_with_most_last = []
-        cand_with_max = max(cand_obj, key=lambda v: v.last_place_votes)
-        most_last_vote = cand_with_max.last_place_votes
-        for cand in cand_obj:
-            if cand.last_place_votes == most_last_vote:
-                cands_with_most_last.append(cand)
-        return cands_with_most_last
-
-    def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
-        cand_process = cand_obj[:]
-        self.elec_round = 1
-        self.run_election(pref_schedule, cand_process, poss_order)
-        sorted_list = sorted(cand_obj, key=lambda v: v.round_elim, reverse=True)
-        map_of_cands = {}
-        # emulates do while
-        count = 0
-        previous = sorted_list[0].round_elim
-        map_of_cands[count] = []
-        # end of first iteration
-        for cand in sorted_list:
-            if (cand.round_elim == previous):
-                map_of_cands[count].append(cand)
-            else:
-                count += 1
-                map_of_cands[count] = []
-                map_of_cands[count].append(cand)
-            previous = cand.round_elim
-            cand.rank = count
-
-        return map_of_cands
+        schedule, missing = self.padded_schedule(pref_schedule, poss_order)
+        won = missing.copy()
+        won[[self.name_to_index[cand.name] for cand in self.cand_objects if cand not in cand_win]] = True
+        round_win, next_round = coombs_majority_rounds(schedule, self.order_tables, self.num_voters, won,
+                                                       self.elec_round)
+        for cand in cand_win:
+            cand_round = int(round_win[0, self.name_to_index[cand.name]])
+            if cand_round >= 0:
+                cand.round_win = cand_round
+        self.elec_round = int(next_round[0])
 
     def create_societal_rank_aliter(self, pref_schedule, cand_obj, poss_order):
         cand_process = cand_obj[:]
@@ -464,193 +317,52 @@ class Coombs(VotingSystem):
 
         return map_of_cands
 
-    def determine_winner(self, pref_schedule, cand_obj, poss_order):
-        cand_obj = cand_obj[:]  # I do not want to modify the actual self.cand_objects
-        societal_order = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
-        num_top = len(societal_order[0])
-        if (num_top == 1):
-            return societal_order[0][0]
-        elif num_top > 1:
-            cand_win = rand.choice(societal_order[0])
-            return cand_win
-        else:
-            return None
+    # round_win for a whole batch of schedules with the majority version of Coombs (-1 if never given a round)
+    def round_win_schedules(self, schedules):
+        return coombs_majority_rounds(schedules, self.order_tables, self.num_voters)[0]
 
     def type(self):
         return "Coombs"
 
 
-class Baldwin(VotingSystem):
+class Baldwin(EliminationSystem):
+    # the candidates with the fewest Borda points (counting only the remaining candidates) go out each round
+    round_rule = staticmethod(baldwin_round)
+    score_attribute = "points"
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
-        self.candidates_remaining = self.cand_objects[:]
-        self.current_pref_table = self.possible_orders[:]
-        self.elec_round = 1
 
     # same rule as BordaCount
     def set_votes(self, pref_schedule, poss_order):
-        for cand in self.cand_objects:
-            cand.points = 0
+        # note Borda points would also change as rounds go on - check in the C++ model also
+        points = self.score_by_position(pref_schedule, poss_order, range(len(poss_order[0]), 0, -1))
+        for cand, pts in zip(self.cand_objects, points):
+            cand.points = pts
             cand.num_votes = 0
 
-        count = 0
-        for val in pref_schedule:
-            ordering = poss_order[count]
-            # note Borda points would also change as rounds go on - check in the C++ model also
-            for i in range(0, len(poss_order[0])):
-                cand = self.find_which_candidate_w_name(ordering[i])  # find the candidate
-                cand.points += val * (len(poss_order[0]) - i)
-            count += 1
-
-    def run_election(self, pref_schedule, cand_obj, poss_order):
-
-        if (len(cand_obj) == 0):
-            return
-        else:
-            self.set_votes(pref_schedule, poss_order)
-            cands_to_elim = self.find_candidates_with_lowest(cand_obj)
-            for cand in cands_to_elim:
-                cand.round_elim = self.elec_round
-                poss_order = self.eliminate_cands(poss_order, cand.name)
-                cand_obj.remove(cand)
-            self.elec_round += 1
-            self.run_election(pref_schedule, cand_obj, poss_order)
-
-    def find_candidates_with_lowest(self, cand_obj):
-        cands_with_least_points = []
-        # this employs the other strategy - sorting and then taking the value of the 0th element
-        sorted_cands = sorted(cand_obj, key=lambda v: v.points)
-        least_points = sorted_cands[0].points
-        for cand in cand_obj:
-            if cand.points == least_points:
-                cands_with_least_points.append(cand)
-        return cands_with_least_points
-
-    def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
-        cand_process = cand_obj[:]
-        self.elec_round = 1
-        self.run_election(pref_schedule, cand_process, poss_order)
-        sorted_list = sorted(cand_obj, key=lambda v: v.round_elim, reverse=True)
-        map_of_cands = {}
-        # emulates do while
-        count = 0
-        previous = sorted_list[0].round_elim
-        map_of_cands[count] = []
-        # end of first iteration
-        for cand in sorted_list:
-            if (cand.round_elim == previous):
-                map_of_cands[count].append(cand)
-            else:
-                count += 1
-                map_of_cands[count] = []
-                map_of_cands[count].append(cand)
-            previous = cand.round_elim
-            cand.rank = count
-
-        return map_of_cands
-
-    def determine_winner(self, pref_schedule, cand_obj, poss_order):
-        cand_obj = cand_obj[:]  # I do not want to modify the actual self.cand_objects
-        societal_order = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
-        num_top = len(societal_order[0])
-        if (num_top == 1):
-            return societal_order[0][0]
-        elif num_top > 1:
-            cand_win = rand.choice(societal_order[0])
-            return cand_win
-        else:
-            return None
+    def store_scores(self, scores):
+        super().store_scores(scores)
+        for cand in self.cand_objects:
+            cand.num_votes = 0
 
     def type(self):
         return "Baldwin"
 
 
-class Nanson(VotingSystem):
+class Nanson(EliminationSystem):
+    # every candidate at or below the mean Borda points (counting only the remaining candidates) goes out each round
+    round_rule = staticmethod(nanson_round)
+    score_attribute = "points"
+
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
-        self.candidates_remaining = self.cand_objects[:]
-        self.current_pref_table = self.possible_orders[:]
-        self.elec_round = 1
 
     # still borda points
     def set_votes(self, pref_schedule, poss_order):
-        for cand in self.cand_objects:
-            cand.points = 0
-
-        count = 0
-        for val in pref_schedule:
-            ordering = poss_order[count]
-            for i in range(0, len(poss_order[0])):
-                cand = self.find_which_candidate_w_name(ordering[i])
-                cand.points += val * (len(poss_order[0]) - i)
-            count += 1
-
-    def run_election(self, pref_schedule, cand_obj, poss_order):
-
-        if len(cand_obj) == 0:
-            return
-        else:
-            self.set_votes(pref_schedule, poss_order)
-            cands_to_elim = self.find_candidates_below_mean(cand_obj)
-            for cand in cands_to_elim:
-                cand.round_elim = self.elec_round
-                poss_order = self.eliminate_cands(poss_order, cand.name)
-                cand_obj.remove(cand)
-            self.elec_round += 1
-            self.run_election(pref_schedule, cand_obj, poss_order)
-
-    def find_candidates_below_mean(self, cand_obj): # run of simulation currently
-        total_pts = 0
-        for cand in cand_obj:
-            total_pts += cand.points
-
-        mean_pts = total_pts / len(cand_obj)
-        cands_to_eliminate = []
-        for cand in cand_obj:
-            if cand.points <= mean_pts:
-                cands_to_eliminate.append(cand)
-        return cands_to_eliminate
-
-    def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
-        cand_process = cand_obj[:]
-        self.elec_round = 1
-        self.run_election(pref_schedule, cand_process, poss_order)
-        sorted_list = sorted(cand_obj, key=lambda v: v.round_elim, reverse=True)
-        map_of_cands = {}
-        # emulates do while
-        count = 0
-        previous = sorted_list[0].round_elim
-        map_of_cands[count] = []
-        # end of first iteration
-        for cand in sorted_list:
-            if (cand.round_elim == previous):
-                map_of_cands[count].append(cand)
-            else:
-                count += 1
-                map_of_cands[count] = []
-                map_of_cands[count].append(cand)
-            previous = cand.round_elim
-            cand.rank = count
-
-        return map_of_cands
-
-    def determine_winner(self, pref_schedule, cand_obj, poss_order):
-        cand_obj = cand_obj[:]  # I do not want to modify the actual self.cand_objects
-
-        # I think that doesnt work --> its still a shallow copy
-        # but I can modify the list correctly
-        # but still pointers to same place
-
-        societal_order = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
-        num_top = len(societal_order[0])
-        if (num_top == 1):
-            return societal_order[0][0]
-        elif num_top > 1:
-            cand_win = rand.choice(societal_order[0])
-            return cand_win
-        else:
-            return None
+        points = self.score_by_position(pref_schedule, poss_order, range(len(poss_order[0]), 0, -1))
+        for cand, pts in zip(self.cand_objects, points):
+            cand.points = pts
 
     def type(self):
         return "Nanson"
@@ -660,22 +372,27 @@ class Nanson(VotingSystem):
 # this is also called Copeland
 
 class PairwiseComparison(VotingSystem):
+    uses_margins = True
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
+        self.tournaments = get_tournament_table(num_cands)
 
     def set_votes(self, pref_schedule, poss_order):
-        for cand in self.cand_objects:
-            cand.num_votes = 0
-
-        for comp in self.comparisons:
-            cand_win = self.compare(comp, pref_schedule, poss_order)
-            if cand_win is None:
-                for name in comp:
-                    cand = self.find_which_candidate_w_name(name)
-                    cand.num_votes += 0.5
-            else:
-                cand_win.num_votes += 1
+        pairwise = self.pairwise_tally(pref_schedule, poss_order)
+        # one point for every head to head win and half a point for every tie
+        wins = (pairwise > pairwise.T).sum(axis=1)
+        ties = (pairwise == pairwise.T).sum(axis=1) - 1  # a candidate always ties with themselves
+        for cand, num_wins, num_ties in zip(self.cand_objects, wins, ties):
+            cand.num_votes = int(num_wins) + 0.5 * int(num_ties)
+
+    # the ranking only depends on the tournament, so it is looked up (see tournaments.py)
+    def rank_and_score(self, schedules, pairwise=None):
+        if pairwise is None:
+            pairwise = self.order_tables.pairwise_matrix(schedules)
+        tournaments = self.tournaments
+        rows = tournaments.rows(pairwise)
+        return tournaments.copeland_ranks[rows].astype(np.intp), tournaments.wins[rows] + 0.5 * tournaments.ties[rows]
 
     def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
         self.set_votes(pref_schedule, poss_order)
@@ -721,6 +438,7 @@ class PairwiseMajority(VotingSystem):
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
+        self.tournaments = get_tournament_table(num_cands)
 
     # fillers functions for now
 
@@ -739,6 +457,30 @@ class PairwiseMajority(VotingSystem):
         cond_cand = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
         return cond_cand
 
+    # the majority relation is not always a ranking, so candidates are ranked by their number of head to head wins
+    # (this is the majority relation whenever it is transitive, the Condorcet winner is always alone in first)
+    def rank_and_score(self, schedules, pairwise=None):
+        if pairwise is None:
+            pairwise = self.order_tables.pairwise_matrix(schedules)
+        rows = self.tournaments.rows(pairwise)
+        return self.tournaments.majority_ranks[rows].astype(np.intp), self.tournaments.wins[rows].astype(np.int64)
+
+    # a pair is ordered by its head to head, not by the win counts (which the other candidates can change), so
+    # IIA and unanimity are checked on the majority relation like transitivity is
+    # the IIA resamples keep every voter's order of the pair, so its head to head and the order never change
+    def violates_IIA(self, pref_schedule):
+        context = self.evaluation_context(pref_schedule)
+        return bool(self.IIA_violations(context.pairwise, context.ranks)[0])
+
+    def IIA_violations(self, pairwise, ranks):
+        return np.zeros(len(pairwise), dtype=bool)
+
+    # a pair every voter agrees on has to win its head to head
+    def violates_unanimity(self, preference_schedule):
+        context = self.evaluation_context(preference_schedule)
+        unanimous = context.pairwise[0] == self.num_voters
+        return bool((unanimous & ~context.beats[0]).any())
+
     def type(self):
         return "Pairwise Majority"
 
@@ -746,23 +488,16 @@ class PairwiseMajority(VotingSystem):
 
 
 class RankedPairs(VotingSystem):
+    uses_margins = True
+    is_neutral = False  # equal margins and the topological sort are resolved in candidate index order
+
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
         self.pairwise_matrix = []
-        self.name_to_index = {}
-        self.index_to_cand = {}
-    def set_votes(self, pref_schedule, poss_order):
-        self.pairwise_matrix = [[0] * self.num_cands for _ in range(self.num_cands)]
-        self.name_to_index = {cand.name: i for i, cand in enumerate(self.cand_objects)}
         self.index_to_cand = {i: cand for i, cand in enumerate(self.cand_objects)}
 
-        for i in range(len(pref_schedule)):
-            order = poss_order[i]
-            for j in range(len(order)):
-                for k in range(j + 1, len(order)):
-                    winner = self.name_to_index[order[j]]
-                    loser = self.name_to_index[order[k]]
-                    self.pairwise_matrix[winner][loser] += pref_schedule[i]
+    def set_votes(self, pref_schedule, poss_order):
+        self.pairwise_matrix = self.pairwise_tally(pref_schedule, poss_order)
 
     def determine_winner(self, pref_schedule, cand_obj, poss_order):
         societal_order = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
@@ -776,52 +511,7 @@ class RankedPairs(VotingSystem):
 
     def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
         self.set_votes(pref_schedule, poss_order)
-
-        pairs = []
-        for i, j in combinations(range(self.num_cands), 2):
-            if self.pairwise_matrix[i][j] > self.pairwise_matrix[j][i]:
-                margin = self.pairwise_matrix[i][j] - self.pairwise_matrix[j][i]
-                pairs.append((i, j, margin))
-            elif self.pairwise_matrix[j][i] > self.pairwise_matrix[i][j]:
-                margin = self.pairwise_matrix[j][i] - self.pairwise_matrix[i][j]
-                pairs.append((j, i, margin))
-
-        pairs.sort(key=lambda x: x[2], reverse=True)
-        locked = [[False] * self.num_cands for _ in range(self.num_cands)]
-
-        def creates_cycle(start, end):
-            visited = set()
-            stack = [end]
-            while stack:
-                node = stack.pop()
-                if node == start:
-                    return True
-                for nxt in range(self.num_cands):
-                    if locked[node][nxt] and nxt not in visited:
-                        visited.add(nxt)
-                        stack.append(nxt)
-            return False
-
-        for winner, loser, _ in pairs:
-            if not creates_cycle(winner, loser):
-                locked[winner][loser] = True
-
-        in_degree = [0] * self.num_cands
-        for i in range(self.num_cands):
-            for j in range(self.num_cands):
-                if locked[i][j]:
-                    in_degree[j] += 1
-
-        queue = deque([i for i in range(self.num_cands) if in_degree[i] == 0])
-        rank_list = []
-        while queue:
-            u = queue.popleft()
-            rank_list.append(self.index_to_cand[u])
-            for v in range(self.num_cands):
-                if locked[u][v]:
-                    in_degree[v] -= 1
-                    if in_degree[v] == 0:
-                        queue.append(v)
+        rank_list = [self.index_to_cand[i] for i in ranked_pairs_order(self.pairwise_matrix)]
 
         for i, cand in enumerate(rank_list):
             cand.rank = i
@@ -833,63 +523,28 @@ class RankedPairs(VotingSystem):
             grouped[r].append(cand)
         return grouped
 
+    # every candidate gets their own rank, the score is how many candidates are ranked below them
+    def rank_and_score(self, schedules, pairwise=None):
+        if pairwise is None:
+            pairwise = self.order_tables.pairwise_matrix(schedules)
+        ranks = ranked_pairs_ranks(pairwise)
+        return ranks, self.num_cands - 1 - ranks
+
     def type(self):
         return "Ranked Pairs"
 
 
-class Dowdall(VotingSystem):
+class Dowdall(PositionalSystem):
+    score_attribute = "num_votes"
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
+        # the fractions are scaled to integers so that ties are exact instead of depending on float rounding
+        self.score_scale = math.lcm(*range(1, self.num_cands + 1))
 
-    def set_votes(self, pref_schedule, poss_order):
-        for cand in self.cand_objects:
-            cand.num_votes = 0
-
-        count = 0
-        for val in pref_schedule:
-            ordering = poss_order[count]
-            for i in range(0, self.num_cands):
-                cand = self.find_which_candidate_w_name(ordering[i])
-                cand.num_votes += (val * 1 / (i + 1))
-            count += 1
-
-    # this function takes in a preference schedule (list of numbers of length factorial(num_cands) and computes the winner
-    def determine_winner(self, pref_schedule, cand_obj, poss_order):
-
-        societal_order = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
-        num_top = len(societal_order[0])
-
-        if (num_top == 1):
-            return societal_order[0][0]
-
-        elif num_top > 1:
-            cand_win = rand.choice(societal_order[0])
-
-            return cand_win
-        else:
-            return None
-
-    def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
-        self.set_votes(pref_schedule, poss_order)
-        sorted_list = sorted(cand_obj, key=lambda v: v.num_votes, reverse=True)
-        map_of_cands = {}
-        # emulates do while
-        count = 0
-        previous = sorted_list[0].num_votes
-        map_of_cands[count] = []
-        # end of first iteration
-        for cand in sorted_list:
-            if (cand.num_votes == previous):
-                map_of_cands[count].append(cand)
-            else:
-                count += 1
-                map_of_cands[count] = []
-                map_of_cands[count].append(cand)
-            previous = cand.num_votes
-            cand.rank = count
-
-        return map_of_cands
+    # 1 point for first place, 1/2 for second, 1/3 for third, etc.
+    def position_scores(self):
+        return [self.score_scale // (i + 1) for i in range(self.num_cands)]
 
     def type(self):
         return "Dowdall"
@@ -909,6 +564,9 @@ class Dictatorship(VotingSystem):
 
 
 class ImposedRule(VotingSystem):
+    uses_pairwise = False
+    is_neutral = False  # the winner is fixed whatever the names
+
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
         self.winner = rand.choice(self.cand_objects)  # the winner is decided before the election takes place
@@ -927,32 +585,30 @@ class ImposedRule(VotingSystem):
         self.create_societal_rank(pref_schedule, cand_obj, poss_order)
         return self.winner
 
+    def rank_and_score(self, schedules, pairwise=None):
+        scores = np.zeros((len(schedules), self.num_cands), dtype=np.intp)
+        scores[:, self.name_to_index[self.winner.name]] = 1
+        return 1 - scores, scores
+
     def type(self):
         return "Imposed Rule"
 
 
 class Black(VotingSystem):
+    uses_margins = True
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
 
     # set votes used based on Borda points
     def set_votes(self, pref_schedule, poss_order):
-        for cand in self.cand_objects:
-            cand.points = 0
-            cand.num_votes = 0
-
-        count = 0
-        for val in pref_schedule:
-            ordering = poss_order[count]
-            for i in range(0, self.num_cands):
-                if (i == 0):
-                    cand = self.find_which_candidate_w_name(ordering[0])
-                    cand.num_votes += val
-                # for consistency
-                cand = self.find_which_candidate_w_name(ordering[i])
-                cand.points += val * (self.num_cands - i)
-            count += 1
+        # num_cands points for first place, num_cands - 1 for second, etc.
+        points = self.score_by_position(pref_schedule, poss_order, range(self.num_cands, 0, -1))
+        # for consistency
+        first_votes = self.tally_by_index(self.first_choices(poss_order), pref_schedule)
+        for cand, pts, votes in zip(self.cand_objects, points, first_votes):
+            cand.points = pts
+            cand.num_votes = votes
 
     def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
         self.set_votes(pref_schedule, poss_order)
@@ -1009,6 +665,16 @@ class Black(VotingSystem):
         else:
             return None
 
+    # the Condorcet candidate (if there is one) is ranked alone at the top and everyone else by Borda points
+    def rank_and_score(self, schedules, pairwise=None):
+        if pairwise is None:
+            pairwise = self.order_tables.pairwise_matrix(schedules)
+        # Borda points are one point per voter plus one for every candidate the voter ranks below
+        points = schedules.sum(axis=1)[:, None] + pairwise.sum(axis=2)
+        condorcet = (pairwise > np.swapaxes(pairwise, 1, 2)).sum(axis=2) == self.num_cands - 1
+        keys = np.where(condorcet, points.max(axis=1, keepdims=True) + 1, points)
+        return dense_ranks(keys), points
+
     def type(self):
         return "Black"
 
@@ -1019,23 +685,16 @@ class Black(VotingSystem):
 # if Condorcet is not there - completely rank by Borda
 
 class TopTwo(VotingSystem):
+    breaks_ties_at_random = True  # ties for the last spot of the top two
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
 
     def set_votes(self, pref_schedule, poss_order):
-        # setting all candidate votes to 0
-        for cand in self.cand_objects:
-            cand.num_votes = 0
-        count = 0
-        # for each value in the preference schedule
-        for val in pref_schedule:
-            # the first one is the one getting votes
-            name_of_cand_getting_votes = poss_order[count][0]
-            # using find candidate with name function here
-            cand_get_votes = self.find_which_candidate_w_name(name_of_cand_getting_votes)
-            cand_get_votes.num_votes += val
-            count += 1
+        # the first choice of each order gets all the votes of that order
+        first_votes = self.tally_by_index(self.first_choices(poss_order), pref_schedule)
+        for cand, votes in zip(self.cand_objects, first_votes):
+            cand.num_votes = votes
 
     # exactly the same as plurality
 
@@ -1144,28 +803,56 @@ class TopTwo(VotingSystem):
         else:
             return None
 
+    # ties for the last spot of the top two are broken with rng (self.rng by default)
+    # the scores are first place votes, except for the top two who get their votes from the runoff
+    def rank_and_score(self, schedules, pairwise=None, rng=None):
+        if rng is None:
+            rng = self.rng
+        schedules = np.atleast_2d(schedules)
+        tables = self.order_tables
+        trials = np.arange(len(schedules))[:, None]
+        votes = positional_scores(schedules, tables.score_matrix((1,)))
+        if pairwise is None:
+            pairwise = tables.pairwise_matrix(schedules)
+
+        # most first place votes first, random order within a tie
+        by_votes = np.lexsort((rng.random(votes.shape), -votes), axis=-1)
+        first, second = by_votes[:, 0], by_votes[:, 1]
+        first_tally = pairwise[trials[:, 0], first, second]
+        second_tally = pairwise[trials[:, 0], second, first]
+
+        # the runoff winner is put above everyone, the loser just below (both on top when the runoff is tied)
+        top = self.num_voters + 2
+        keys = votes.copy()
+        keys[trials[:, 0], first] = np.where(first_tally >= second_tally, top, top - 1)
+        keys[trials[:, 0], second] = np.where(second_tally >= first_tally, top, top - 1)
+        scores = votes.copy()
+        scores[trials[:, 0], first] = first_tally
+        scores[trials[:, 0], second] = second_tally
+
+        # with a majority winner there is no runoff and it is just plurality
+        majority = (2 * votes > self.num_voters).any(axis=1)
+        keys[majority] = votes[majority]
+        scores[majority] = votes[majority]
+        return dense_ranks(keys), scores
+
     def type(self):
         return "Top Two"
 
 
 class Minimax(VotingSystem):
+    uses_margins = True
 
     def __init__(self, num_voters, num_cands, cand_objects):
         super().__init__(num_voters, num_cands, cand_objects)
 
     def set_votes(self, pref_schedule, poss_order):
-        for cand in self.cand_objects:
-            rival_cands = self.cand_objects[:]
-            rival_cands.remove(cand)
-            pairwise_defeats = []
-            for rival in rival_cands:
-                self.compare([cand.name, rival.name], pref_schedule, poss_order)  # resets condorcet each time
-                loss = rival.condorcet_points - cand.condorcet_points
-                if (loss > 0):
-                    pairwise_defeats.append(loss)
-                else:
-                    pairwise_defeats.append(0)
-            cand.greatest_pairwise_defeat = max(pairwise_defeats)
+        pairwise = self.pairwise_tally(pref_schedule, poss_order)
+        # defeats[c][r] is how much candidate c loses to rival r by (0 if c does not lose)
+        defeats = np.maximum(pairwise.T - pairwise, 0)
+        np.fill_diagonal(defeats, 0)
+        for cand, greatest in zip(self.cand_objects, defeats.max(axis=1)):
+            cand.greatest_pairwise_defeat = int(greatest)
 
     def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
         self.set_votes(pref_schedule, poss_order)
@@ -1200,9 +887,62 @@ class Minimax(VotingSystem):
         else:
             return None
 
+    # the candidate with the smallest greatest pairwise defeat is ranked first
+    def rank_and_score(self, schedules, pairwise=None):
+        if pairwise is None:
+            pairwise = self.order_tables.pairwise_matrix(schedules)
+        greatest = np.maximum(np.swapaxes(pairwise, 1, 2) - pairwise, 0).max(axis=2)
+        return dense_ranks(greatest, higher_is_better=False), greatest
+
     def type(self):
         return "Minimax"
 
+
+# Schulze: a beats b if the strongest path from a to b is stronger than the strongest path back (see
+# engines.strongest_paths), which is transitive but can leave candidates incomparable
+# candidates are ranked by how many others beat them, so the first rank is exactly the unbeaten candidates
+class Schulze(VotingSystem):
+    uses_margins = True
+
+    def __init__(self, num_voters, num_cands, cand_objects):
+        super().__init__(num_voters, num_cands, cand_objects)
+
+    def set_votes(self, pref_schedule, poss_order):
+        pairwise = self.pairwise_tally(pref_schedule, poss_order)
+        _, defeats = self.rank_and_score(np.atleast_2d(pref_schedule), pairwise[None])
+        for cand, num_defeats in zip(self.cand_objects, defeats[0]):
+            cand.path_defeats = int(num_defeats)
+
+    def create_societal_rank(self, pref_schedule, cand_obj, poss_order):
+        self.set_votes(pref_schedule, poss_order)
+        ranks = dense_ranks([cand.path_defeats for cand in cand_obj], higher_is_better=False)
+        map_of_cands = {}
+        for cand, rank in zip(cand_obj, ranks):
+            cand.rank = int(rank)
+            map_of_cands.setdefault(cand.rank, []).append(cand)
+        return dict(sorted(map_of_cands.items()))
+
+    def determine_winner(self, pref_schedule, cand_obj, poss_order):
+        societal_order = self.create_societal_rank(pref_schedule, cand_obj, poss_order)
+        num_top = len(societal_order[0])
+        if num_top == 1:
+            return societal_order[0][0]
+        elif num_top > 1:
+            return rand.choice(societal_order[0])
+        else:
+            return None
+
+    # the score is how many candidates beat the candidate through strongest paths
+    def rank_and_score(self, schedules, pairwise=None):
+        if pairwise is None:
+            pairwise = self.order_tables.pairwise_matrix(schedules)
+        paths = strongest_paths(pairwise)
+        defeats = (paths < np.swapaxes(paths, 1, 2)).sum(axis=2)
+        return dense_ranks(defeats, higher_is_better=False), defeats
+
+    def type(self):
+        return "Schulze"
+
 # randomly select dictator?
 
 
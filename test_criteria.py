@@ -0,0 +1,32 @@
+from systems import PairwiseMajority, TopTwo
+from sweep import make_system
+from criteria import violation_masks, EvaluationContext
+import numpy as np
+
+
+# Pairwise Majority orders a pair by its head to head, which the IIA resamples keep and a unanimous pair wins
+def test_pairwise_majority_IIA_and_unanimity():
+    system = make_system(PairwiseMajority, 5, 3)
+    system.find_IIA_violations(100, "IC")
+    system.find_unanimity_vios(100, "IC")
+    assert system.IIAv == 0
+    assert system.unam_vios == 0
+
+
+# the batch checks agree with the checks of the system one schedule at a time
+def test_pairwise_majority_batch_matches_schedules():
+    system = make_system(PairwiseMajority, 4, 4)
+    schedules = np.random.default_rng(1).multinomial(4, np.full(24, 1 / 24), size=200)
+    masks = violation_masks(system, schedules, criteria=("unanimity", "IIA"))
+    for schedule, mask in zip(schedules, masks.tolist()):
+        assert bool(mask & 1) == system.violates_unanimity(schedule)
+        assert bool(mask & 2) == system.violates_IIA(schedule)
+
+
+# Top Two breaks ties for the second spot inside its ranking, so copies of one schedule are ranked one by one
+def test_random_ranking_per_copy():
+    system = make_system(TopTwo, 4, 4)
+    schedule = np.zeros(24, dtype=int)
+    schedule[[0, 6, 12, 18]] = 1  # every candidate has one first place vote
+    context = EvaluationContext(system, np.tile(schedule, (200, 1)))
+    assert len(np.unique(context.ranks, axis=0)) > 1
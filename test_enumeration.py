@@ -0,0 +1,29 @@
+from systems import InstantRunoff, BordaCount, Minimax, Plurality
+from sweep import make_system
+from enumeration import exact_joint_probabilities
+import numpy as np
+
+
+CRITERIA = ("condorcet", "condorcet_loser", "majority", "unanimity", "transitivity")
+
+
+# the orbit reduction has to give the full enumeration back whatever the chunks are, including chunks
+# without a single representative in them
+def check_reduction(system_class, num_voters, num_cands, chunk_sizes):
+    system = make_system(system_class, num_voters, num_cands)
+    system.is_neutral = False
+    full = exact_joint_probabilities(system, "IC", criteria=CRITERIA)
+    system.is_neutral = True
+    for chunk_size in chunk_sizes:
+        reduced = exact_joint_probabilities(system, "IC", criteria=CRITERIA, chunk_size=chunk_size)
+        assert np.allclose(reduced, full), (system.type(), chunk_size)
+
+
+def test_reduction_small_chunks():
+    check_reduction(InstantRunoff, 3, 3, (1, 5, 37, 100000))
+    check_reduction(BordaCount, 4, 3, (1, 7, 100000))
+    check_reduction(Minimax, 4, 3, (1, 7, 100000))
+
+
+def test_reduction_four_candidates():
+    check_reduction(Plurality, 6, 4, (997, 100000))
@@ -0,0 +1,12 @@
+from importance import TieTiltedSampler
+import numpy as np
+
+
+# with 2 candidates no order is left over for the third group, and with an odd number of voters no tie can happen
+def test_two_candidates():
+    for distribution in ("IC", "IAC"):
+        for num_voters in (5, 6):
+            sampler = TieTiltedSampler(num_voters, 2, distribution)
+            schedules = sampler.sample(1000, np.random.default_rng(0))
+            assert (schedules.sum(axis=1) == num_voters).all()
+            assert abs(sampler.likelihood_ratios(schedules).mean() - 1) < 0.1
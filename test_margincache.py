@@ -0,0 +1,15 @@
+from systems import Black
+from sweep import make_system
+import numpy as np
+
+
+# a voter for A > B > C and one for C > B > A leave every margin as it was but add to Black's Borda scores
+def test_same_margins_more_voters():
+    system = make_system(Black, 3, 3)
+    schedule = np.array([1, 0, 0, 1, 0, 1])
+    more_voters = schedule + np.array([1, 0, 0, 0, 0, 1])
+    system.societal_ranking(schedule)
+    cached = system.societal_ranking(more_voters)
+    fresh = make_system(Black, 3, 3).societal_ranking(more_voters)
+    assert np.array_equal(cached.scores, fresh.scores)
+    assert np.array_equal(cached.ranks, fresh.ranks)
@@ -0,0 +1,19 @@
+from samplers import make_sampler
+from distributions import custom_distribution_batch
+import numpy as np
+import pytest
+
+
+# IC and IAC have no weights, they are ignored like the find_*_vios methods always did
+def test_weights_ignored_without_custom():
+    for distribution in ("IC", "IAC"):
+        sampler = make_sampler(distribution, 5, 3, weights=[1 / 6] * 6)
+        assert sampler.sample(10, np.random.default_rng(0)).sum(axis=1).tolist() == [5] * 10
+
+
+def test_custom_weights_one_per_order():
+    with pytest.raises(ValueError):
+        make_sampler("Custom", 5, 3, weights=[0.5, 0.5])
+    with pytest.raises(ValueError):
+        custom_distribution_batch(10, 5, 3, [1 / 7] * 7)
+    assert custom_distribution_batch(10, 5, 3, [1 / 6] * 6, rng=0).shape == (10, 6)
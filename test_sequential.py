@@ -0,0 +1,22 @@
+from systems import Plurality, BordaCount
+from sweep import make_system
+from sequential import run_sequential, run_criteria_sequential
+import pytest
+
+
+# without a precision target the runs only stop on the trial cap or the clock
+def test_no_half_width_target():
+    system = make_system(Plurality, 5, 3)
+    result = run_sequential(system, "find_condorcet_vios", "IC", half_width_target=None, max_trials=2500)
+    assert result["stopped_by"] == "max_trials"
+    assert result["trials"] == 2500
+    result = run_sequential(system, "find_condorcet_vios", "IC", half_width_target=None, max_seconds=0.1)
+    assert result["stopped_by"] == "max_seconds"
+    systems = [make_system(Plurality, 5, 3), make_system(BordaCount, 5, 3)]
+    result = run_criteria_sequential(systems, "IC", half_width_target=None, max_trials=1500)
+    assert result["stopped_by"] == "max_trials"
+
+
+def test_no_limit_at_all():
+    with pytest.raises(ValueError):
+        run_sequential(make_system(Plurality, 5, 3), "find_condorcet_vios", "IC", half_width_target=None)
@@ -0,0 +1,16 @@
+from systems import BordaCount, TruncatedBorda
+from sweep import compare_systems, make_system
+
+
+def test_make_system_with_arguments():
+    assert make_system(TruncatedBorda, 5, 4, num_rank=2).num_rank == 2
+    assert make_system((TruncatedBorda, {"num_rank": 3}), 5, 4).num_rank == 3
+
+
+# Truncated Borda ranking every position is Borda Count, so the two rank the same schedules the same way
+# (the criteria on the winner are left out, ties for first are broken separately for each system)
+def test_compare_truncated_borda():
+    results = compare_systems([BordaCount, (TruncatedBorda, {"num_rank": 3})], 5, 3, 500, "IC",
+                              criteria=("unanimity", "IIA", "transitivity"), seed=1)
+    borda, truncated = results["systems"]
+    assert results["violations"][borda] == results["violations"][truncated]
@@ -0,0 +1,38 @@
+from tournaments import TournamentTable, MAX_CANDS
+import numpy as np
+import pytest
+
+
+def test_saved_table_is_loaded(tmp_path):
+    path = str(tmp_path / "tournaments_3.npz")
+    table = TournamentTable(3, path)
+    table.fill()
+    table.save()
+    assert np.array_equal(TournamentTable(3, path).codes, table.codes)
+
+
+# a table for another number of candidates, from another version or that is not a table at all is rebuilt
+def test_unusable_files_are_ignored(tmp_path):
+    path = str(tmp_path / "tournaments.npz")
+    table = TournamentTable(3)
+    table.fill()
+    table.save(path)
+    assert len(TournamentTable(4, path).codes) == 0
+
+    fields = dict(np.load(path))
+    fields["version"] = np.array(0)
+    np.savez(path, **fields)
+    assert len(TournamentTable(3, path).codes) == 0
+
+    del fields["version"]
+    np.savez(path, **fields)
+    assert len(TournamentTable(3, path).codes) == 0
+
+    with open(path, "wb") as file:
+        file.write(b"not a table")
+    assert len(TournamentTable(3, path).codes) == 0
+
+
+def test_too_many_candidates():
+    with pytest.raises(ValueError):
+        TournamentTable(MAX_CANDS + 1)
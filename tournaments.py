@@ -0,0 +1,159 @@
+from itertools import combinations
+from engines import dense_ranks
+import numpy as np
+import atexit
+import zipfile
+import os
+
+
+# Pairwise Comparison (Copeland) and Pairwise Majority only look at who wins each head to head, so everything they
+# need is worked out once per tournament and looked up after that
+# a tournament is coded in base 3 with one digit per pair (a, b), a < b in combinations order:
+# 0 if a and b tie, 1 if a beats b and 2 if b beats a (at most 3^15 codes with 6 candidates)
+# only the tournaments that actually come up are stored
+# setting VOTING_TABLE_DIR saves the tables there when the program ends so later runs start with them, without it
+# nothing is written (a table can still be saved by hand with save(path))
+TABLE_DIR = os.environ.get("VOTING_TABLE_DIR")
+
+# the codes are int64, 3^36 (9 candidates) still fits but 3^45 (10 candidates) does not
+MAX_CANDS = 9
+
+# saved with every table, a file with another version or number of candidates is ignored and the table rebuilt
+FORMAT_VERSION = 1
+
+# what is stored for every tournament, one row per code
+FIELDS = ("codes", "wins", "ties", "copeland_ranks", "majority_ranks", "condorcet_winners", "condorcet_losers",
+          "transitive")
+
+
+class TournamentTable:
+    def __init__(self, num_cands, path=None):
+        if num_cands > MAX_CANDS:
+            raise ValueError(f"tournament tables handle at most {MAX_CANDS} candidates, got {num_cands}")
+        self.num_cands = num_cands
+        self.pairs = np.array(list(combinations(range(num_cands), 2)), dtype=np.intp).reshape(-1, 2)
+        self.powers = 3 ** np.arange(len(self.pairs), dtype=np.int64)
+        self.path = path
+        self.changed = False
+        self.codes = np.zeros(0, dtype=np.int64)
+        self.wins = np.zeros((0, num_cands), dtype=np.int8)
+        self.ties = np.zeros((0, num_cands), dtype=np.int8)
+        self.copeland_ranks = np.zeros((0, num_cands), dtype=np.int8)
+        self.majority_ranks = np.zeros((0, num_cands), dtype=np.int8)
+        self.condorcet_winners = np.zeros(0, dtype=np.int8)
+        self.condorcet_losers = np.zeros(0, dtype=np.int8)
+        self.transitive = np.zeros(0, dtype=bool)
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    # the code of the tournament of every pairwise matrix (num_trials x n x n)
+    def encode(self, pairwise):
+        pairwise = np.asarray(pairwise)
+        above = pairwise[..., self.pairs[:, 0], self.pairs[:, 1]]
+        below = pairwise[..., self.pairs[:, 1], self.pairs[:, 0]]
+        digits = np.where(above > below, 1, np.where(above < below, 2, 0))
+        return digits @ self.powers
+
+    # beats[t][a][b] is True if a beats b in tournament codes[t]
+    def decode(self, codes):
+        digits = (np.asarray(codes)[:, None] // self.powers) % 3
+        beats = np.zeros((len(digits), self.num_cands, self.num_cands), dtype=bool)
+        beats[:, self.pairs[:, 0], self.pairs[:, 1]] = digits == 1
+        beats[:, self.pairs[:, 1], self.pairs[:, 0]] = digits == 2
+        return beats
+
+    # the row of the table for every pairwise matrix, tournaments that are not in the table yet are added first
+    def rows(self, pairwise):
+        codes = self.encode(pairwise)
+        rows = np.searchsorted(self.codes, codes)
+        found = np.zeros(len(codes), dtype=bool)
+        if len(self.codes):
+            found = self.codes[np.minimum(rows, len(self.codes) - 1)] == codes
+        if not found.all():
+            self.add(np.unique(codes[~found]))
+            rows = np.searchsorted(self.codes, codes)
+        return rows
+
+    def add(self, codes):
+        beats = self.decode(codes)
+        ties = ~(beats | np.swapaxes(beats, 1, 2))
+        wins = beats.sum(axis=2)
+        num_ties = ties.sum(axis=2) - 1  # a candidate always ties with themselves
+        at_least = ~np.swapaxes(beats, 1, 2)
+        steps = at_least.astype(np.int64)
+        single_winner = beats.sum(axis=2) == self.num_cands - 1
+        single_loser = beats.sum(axis=1) == self.num_cands - 1
+        entries = {
+            "codes": codes,
+            "wins": wins,
+            "ties": num_ties,
+            # ranked on twice the Copeland score so that the half points stay integers
+            "copeland_ranks": dense_ranks(2 * wins + num_ties),
+            "majority_ranks": dense_ranks(wins),
+            "condorcet_winners": np.where(single_winner.any(axis=1), np.argmax(single_winner, axis=1), -1),
+            "condorcet_losers": np.where(single_loser.any(axis=1), np.argmax(single_loser, axis=1), -1),
+            # the weak majority relation, a >= b and b >= c without a >= c is a violation
+            "transitive": ~(((steps @ steps) > 0) & ~at_least).any(axis=(1, 2)),
+        }
+        order = np.argsort(np.concatenate([self.codes, codes]), kind="stable")
+        for field in FIELDS:
+            old = getattr(self, field)
+            setattr(self, field, np.concatenate([old, entries[field].astype(old.dtype)])[order])
+        self.changed = True
+
+    # every tournament at once, only sensible up to 5 candidates (3^10 codes)
+    def fill(self):
+        self.add(np.setdiff1d(np.arange(3 ** len(self.pairs), dtype=np.int64), self.codes))
+
+    # a file that is unreadable, from another version or for another number of candidates leaves the table empty
+    def load(self, path):
+        try:
+            with np.load(path) as saved:
+                if int(saved["version"]) != FORMAT_VERSION or int(saved["num_cands"]) != self.num_cands:
+                    return
+                entries = {field: saved[field].astype(getattr(self, field).dtype) for field in FIELDS}
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return
+        codes = entries["codes"]
+        if any(len(entries[field]) != len(codes) for field in FIELDS) or (np.diff(codes) <= 0).any():
+            return
+        if entries["wins"].shape[1:] != (self.num_cands,):
+            return
+        for field in FIELDS:
+            setattr(self, field, entries[field])
+
+    # written to a temporary file first so that an interrupted save never leaves a broken table behind
+    def save(self, path=None):
+        path = self.path if path is None else path
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez(file, version=FORMAT_VERSION, num_cands=self.num_cands,
+                     **{field: getattr(self, field) for field in FIELDS})
+        os.replace(temporary, path)
+        self.changed = False
+
+
+# one table per number of candidates, shared by every system, saved when the program ends if TABLE_DIR is set
+_tables_by_num_cands = {}
+
+
+def get_tournament_table(num_cands):
+    table = _tables_by_num_cands.get(num_cands)
+    if table is None:
+        path = None if TABLE_DIR is None else os.path.join(TABLE_DIR, f"tournaments_{num_cands}.npz")
+        table = TournamentTable(num_cands, path)
+        _tables_by_num_cands[num_cands] = table
+    return table
+
+
+@atexit.register
+def save_tournament_tables():
+    for table in _tables_by_num_cands.values():
+        if table.changed:
+            try:
+                table.save()
+            except OSError:
+                pass
@@ -1,12 +1,23 @@
 from abc import ABC, abstractmethod
 from itertools import *
-from distributions import generate_IC_pref, generate_IAC_pref, custom_distribution
+from samplers import make_sampler
+from distributions import random_compositions
+from ordertables import get_order_tables, order_rank
+from engines import RankingResult
+from margincache import MarginCache
+from criteria import CRITERIA, EvaluationContext, violation_masks, joint_counts, marginal_counts, unique_schedules
+from enumeration import exact_joint_parallel
 import random as rand
 import numpy as np
 import math
 
 
 class VotingSystem(ABC):
+    uses_pairwise = True  # whether rank_and_score needs the pairwise matrices of the schedules
+    is_neutral = True  # renaming the candidates renames the result in the same way (see canonical_relabeling)
+    uses_margins = False  # whether the ranking only depends on the pairwise margins (see margincache.py)
+    breaks_ties_at_random = False  # whether rank_and_score draws from rng, so repeats of a schedule can differ
+
     def __init__(self, num_voters, num_cands, cand_objects):
         self.num_voters = num_voters
         self.num_cands = num_cands
@@ -18,6 +29,35 @@ class VotingSystem(ABC):
         self.possible_orders = []
         self.generate_candidates_combos()  # generates all preference orders
 
+        # integer versions of possible_orders so that scoring and comparisons work on candidate indices
+        # instead of scanning tuples of names (shared between all systems with the same number of candidates)
+        self.name_to_index = {name: i for i, name in enumerate(self.cand_names)}
+        self.order_tables = get_order_tables(self.num_cands)
+        self.order_matrix = self.order_tables.orders  # candidate index at each position of each order
+        self.position_matrix = self.order_tables.positions  # position of each candidate in each order
+        self.order_index = {order: i for i, order in enumerate(self.possible_orders)}
+
+        # the last pairwise matrix computed, so that every check on the same schedule reuses it
+        self.pairwise_cache_key = None
+        self.pairwise_cache = None
+
+        # the evaluation context of the last schedule checked, so the criteria read the societal ranking,
+        # the pairwise matrix and the tallies from it instead of recomputing them for every comparison
+        # context_stats[value] counts how often each value was computed and how often it was reused
+        self.context_cache_key = None
+        self.context_cache = None
+        self.context_stats = {}
+
+        # rankings already worked out for a margin matrix, only for the systems that use_margins
+        self.margin_cache = MarginCache(self.num_cands) if self.uses_margins else None
+
+        # schedules for the find_*_vios methods are drawn from this generator in batches of batch_size
+        self.rng = np.random.default_rng()
+        self.batch_size = 1000
+
+        # how many schedules with the same relative ranking of a pair violates_IIA tries
+        self.IIA_resamples = 300
+
         self.comparisons = list(combinations(self.cand_names, 2))
         self.three_element_comps = list(permutations(self.cand_names,3))
         # gives all the possible comparisons between the two candidates
@@ -49,15 +89,44 @@ class VotingSystem(ABC):
         self.possible_orders = list(permutations(self.cand_names))
         # for instance [(A,B,C),(A,C,B),(B,A,C),(B,C,A),(C,A,B),(C,B,A)]
 
+    # yields num_trials preference schedules drawn from the distribution ("IC", "IAC", "Custom" or a Sampler)
+    # the schedules are generated batch_size at a time instead of one by one
+    def generate_schedules(self, num_trials, distribution, weights=None):
+        for batch in self.generate_batches(num_trials, distribution, weights):
+            for pref_schedule in batch:
+                yield pref_schedule
+
+    def generate_batches(self, num_trials, distribution, weights=None):
+        params = {} if weights is None else {"weights": weights}
+        sampler = make_sampler(distribution, self.num_voters, self.num_cands, **params)
+        remaining = num_trials
+        while remaining > 0:
+            batch = sampler.sample(min(self.batch_size, remaining), self.rng)
+            remaining -= len(batch)
+            yield batch
+
+    # yields (schedule, count) for the distinct schedules of each batch, count being how often it was drawn
+    # with few voters most of a batch are repeats, so find_IIA_violations checks each schedule once and adds count
+    # (the repeats share one set of IIA resamples, which keeps the rate unbiased)
+    # systems that break ties at random get every copy on its own with a count of 1
+    def generate_unique_schedules(self, num_trials, distribution, weights=None):
+        for batch in self.generate_batches(num_trials, distribution, weights):
+            if self.breaks_ties_at_random:
+                for pref_schedule in batch:
+                    yield pref_schedule, 1
+                continue
+            schedules, _, counts = unique_schedules(batch)
+            for pref_schedule, count in zip(schedules, counts.tolist()):
+                yield pref_schedule, count
+
     # this function finds the Condorcet candidate
     # returns None if it does not exist
     def find_Condorcet_candidate(self, pref_schedule):
-        for cand in self.cand_objects:
-            cand.condorcet_wins = 0
-        for comp in self.comparisons:
-            cand_winner = self.compare(comp, pref_schedule, self.possible_orders)
-            if cand_winner is not None:
-                cand_winner.condorcet_wins += 1
+        pairwise = self.pairwise_tally(pref_schedule)
+        # a candidate wins a head to head if more voters prefer them over the rival than the other way around
+        wins = (pairwise > pairwise.T).sum(axis=1)
+        for cand, num_wins in zip(self.cand_objects, wins):
+            cand.condorcet_wins = int(num_wins)
         for cand in self.cand_objects:
             if cand.condorcet_wins == self.num_cands - 1:
                 self.condorcet_count += 1
@@ -67,20 +136,7 @@ class VotingSystem(ABC):
     # compares the two candidates to see which is preferred head to head
     # returns the name of the candidate that is more preferred, if tied returns None (empty string)
     def compare(self, comp, pref_schedule, ordering):
-        cand1 = self.find_which_candidate_w_name(comp[0])
-        cand2 = self.find_which_candidate_w_name(comp[1])
-        # resets condorcet points for all candidates (just to be sure)
-        for cand in self.cand_objects:
-            cand.condorcet_points = 0
-        for i in range(0, len(pref_schedule)):
-            order = ordering[i]
-            index_one = self.find_index_of(comp[0], order)
-            index_two = self.find_index_of(comp[1], order)
-            # whichever candidate has a lower index (more preferred) gets the condorcet_points
-            if (index_one < index_two):
-                cand1.condorcet_points += pref_schedule[i]
-            elif (index_one > index_two):
-                cand2.condorcet_points += pref_schedule[i]
+        cand1, cand2 = self.tally_pair(comp, pref_schedule, ordering)
         if (cand1.condorcet_points > cand2.condorcet_points):
             return cand1
         elif (cand2.condorcet_points > cand1.condorcet_points):
@@ -89,13 +145,39 @@ class VotingSystem(ABC):
         elif (cand1.condorcet_points == cand2.condorcet_points):
             return None
 
-    def find_Condorcet_loser(self, pref_schedule):
+    # sets the condorcet points of the two candidates in comp (everyone else is reset to 0)
+    # whichever candidate has a lower index (more preferred) in an order gets the voters of that order
+    def tally_pair(self, comp, pref_schedule, ordering):
+        one = self.name_to_index[comp[0]]
+        two = self.name_to_index[comp[1]]
+        cand1 = self.cand_objects[one]
+        cand2 = self.cand_objects[two]
+        # resets condorcet points for all candidates (just to be sure)
         for cand in self.cand_objects:
-            cand.condorcet_losses = 0
-        for comp in self.comparisons:
-            cand_loser = self.compare_loser(comp, pref_schedule, self.possible_orders)
-            if cand_loser is not None:
-                cand_loser.condorcet_losses += 1
+            cand.condorcet_points = 0
+        pairwise = self.pairwise_tally(pref_schedule, ordering)
+        cand1.condorcet_points = int(pairwise[one, two])
+        cand2.condorcet_points = int(pairwise[two, one])
+        return cand1, cand2
+
+    # the n x n pairwise matrix of the schedule, pairwise[a][b] is the number of voters preferring a over b
+    # every Condorcet style check goes through here so the matrix is only computed once per schedule
+    def pairwise_tally(self, pref_schedule, ordering=None):
+        if ordering is None:
+            ordering = self.possible_orders
+        # candidates eliminated from the orders count as ranked below everyone left
+        schedule, missing = self.padded_schedule(pref_schedule, ordering)
+        key = schedule.tobytes()
+        if key != self.pairwise_cache_key:
+            self.pairwise_cache = self.order_tables.pairwise_matrix(schedule)
+            self.pairwise_cache_key = key
+        return self.pairwise_cache
+
+    def find_Condorcet_loser(self, pref_schedule):
+        pairwise = self.pairwise_tally(pref_schedule)
+        losses = (pairwise < pairwise.T).sum(axis=1)
+        for cand, num_losses in zip(self.cand_objects, losses):
+            cand.condorcet_losses = int(num_losses)
         for cand in self.cand_objects:
             if cand.condorcet_losses == self.num_cands - 1:
                 return cand
@@ -103,20 +185,7 @@ class VotingSystem(ABC):
 
 
     def compare_loser(self, comp, pref_schedule, ordering):
-        cand1 = self.find_which_candidate_w_name(comp[0])
-        cand2 = self.find_which_candidate_w_name(comp[1])
-        # resets condorcet points for all candidates (just to be sure)
-        for cand in self.cand_objects:
-            cand.condorcet_points = 0
-        for i in range(0, len(pref_schedule)):
-            order = ordering[i]
-            index_one = self.find_index_of(comp[0], order)
-            index_two = self.find_index_of(comp[1], order)
-            # whichever candidate has a lower index (more preferred) gets the condorcet_points
-            if (index_one < index_two):
-                cand1.condorcet_points += pref_schedule[i]
-            elif (index_one > index_two):
-                cand2.condorcet_points += pref_schedule[i]
+        cand1, cand2 = self.tally_pair(comp, pref_schedule, ordering)
         if (cand1.condorcet_points < cand2.condorcet_points):
             return cand1
         elif (cand2.condorcet_points < cand1.condorcet_points):
@@ -127,10 +196,10 @@ class VotingSystem(ABC):
 
     # helper functions
     def find_which_candidate_w_name(self, name):
-        for cand in self.cand_objects:
-            if cand.name == name:
-                return cand
-        return None
+        index = self.name_to_index.get(name)
+        if index is None:
+            return None
+        return self.cand_objects[index]
 
     def find_index_of(self, val, ordering):
         for i in range(0, len(ordering)):
@@ -138,6 +207,121 @@ class VotingSystem(ABC):
                 return i
         return -1
 
+    # returns a (len(ordering), num_cands) array with the position of every candidate in every order
+    # candidates missing from an order (eliminated ones) get -1 like find_index_of
+    def position_table(self, ordering):
+        if ordering is self.possible_orders:
+            return self.position_matrix
+        positions = np.full((len(ordering), self.num_cands), -1, dtype=np.intp)
+        for row in range(0, len(ordering)):
+            for pos, name in enumerate(ordering[row]):
+                positions[row, self.name_to_index[name]] = pos
+        return positions
+
+    # rewrites a schedule given over some other list of full orders (for instance after move_up)
+    # as a schedule over self.possible_orders, returns None if candidates are missing from the orders
+    def canonical_schedule(self, pref_schedule, ordering):
+        pref_schedule = np.asarray(pref_schedule)
+        if ordering is self.possible_orders:
+            return pref_schedule
+        if len(ordering[0]) != self.num_cands:
+            return None
+        order_indices = [self.order_index[order] for order in ordering[:len(pref_schedule)]]
+        return np.bincount(order_indices, weights=pref_schedule,
+                           minlength=len(self.possible_orders)).astype(pref_schedule.dtype)
+
+    # like canonical_schedule but also takes orders with eliminated candidates (see eliminate_cands)
+    # the missing candidates are put at the end of every order, so the schedule is over self.possible_orders
+    # returns the schedule and a mask of the candidates that were missing
+    def padded_schedule(self, pref_schedule, ordering):
+        missing = np.zeros(self.num_cands, dtype=bool)
+        schedule = self.canonical_schedule(pref_schedule, ordering)
+        if schedule is not None:
+            return schedule, missing
+        pref_schedule = np.asarray(pref_schedule)
+        present = set(ordering[0])
+        missing_names = tuple(name for name in self.cand_names if name not in present)
+        missing[[self.name_to_index[name] for name in missing_names]] = True
+        order_indices = [self.order_index[tuple(order) + missing_names] for order in ordering[:len(pref_schedule)]]
+        schedule = np.bincount(order_indices, weights=pref_schedule, minlength=len(self.possible_orders))
+        return schedule.astype(pref_schedule.dtype), missing
+
+    # index of the candidate ranked first in each order
+    def first_choices(self, ordering):
+        if ordering is self.possible_orders:
+            return self.order_matrix[:, 0]
+        return np.array([self.name_to_index[order[0]] for order in ordering], dtype=np.intp)
+
+    # index of the candidate ranked last in each order
+    def last_choices(self, ordering):
+        if ordering is self.possible_orders:
+            return self.order_matrix[:, -1]
+        return np.array([self.name_to_index[order[-1]] for order in ordering], dtype=np.intp)
+
+    # adds up the voters of every order onto the candidate index given for that order
+    # returns one total per candidate (in the order of cand_objects)
+    def tally_by_index(self, cand_indices, pref_schedule):
+        pref_schedule = np.asarray(pref_schedule)
+        totals = np.zeros(self.num_cands, dtype=pref_schedule.dtype)
+        np.add.at(totals, cand_indices[:len(pref_schedule)], pref_schedule)
+        return totals.tolist()
+
+    # gives every candidate position_scores[p] points for each voter ranking them in position p of their order
+    # returns one total per candidate (in the order of cand_objects)
+    def score_by_position(self, pref_schedule, poss_order, position_scores):
+        pref_schedule = np.asarray(pref_schedule)
+        positions = self.position_table(poss_order)[:len(pref_schedule)]
+        # the padding makes positions without a score (and -1 for missing candidates) worth 0
+        scores = np.zeros(self.num_cands + 1, dtype=np.asarray(position_scores).dtype)
+        scores[:len(position_scores)] = position_scores
+        return (pref_schedule @ scores[positions]).tolist()
+
+    # the (memoized) evaluation context of a single schedule, reused for as long as the same schedule is checked
+    def evaluation_context(self, pref_schedule):
+        schedule = np.asarray(pref_schedule)
+        key = schedule.tobytes()
+        if key != self.context_cache_key:
+            self.context_cache = EvaluationContext(self, schedule)
+            self.context_cache_key = key
+        return self.context_cache
+
+    # 1 if candidate one is ranked above candidate two, 2 if it is the other way around and 0 if they are tied
+    def pair_winner(self, ranks, one, two):
+        if ranks[one] < ranks[two]:
+            return 1
+        elif ranks[one] > ranks[two]:
+            return 2
+        return 0
+
+    # ranks a schedule (or a batch of schedules) without writing anything onto the Candidates or the system
+    # so several rankings can be computed at the same time and the results can be cached
+    # returns a RankingResult with the ranks, the tie groups and the scores of every candidate
+    def societal_ranking(self, pref_schedule):
+        schedules = np.asarray(pref_schedule)
+        ranks, scores = self.cached_rank_and_score(np.atleast_2d(schedules))
+        if schedules.ndim == 1:
+            return RankingResult(ranks[0], scores[0])
+        return RankingResult(ranks, scores)
+
+    # ranks and scores (num_trials x n each) for a batch of schedules (num_trials x n!) over all the candidates
+    # implemented by the systems without touching the Candidates, create_societal_rank is the old interface
+    # pairwise can pass in the pairwise matrices of the batch when they were already computed (see uses_pairwise)
+    @abstractmethod
+    def rank_and_score(self, schedules, pairwise=None):
+        pass
+
+    # rank_and_score through the margin cache when the system only depends on the margins
+    def cached_rank_and_score(self, schedules, pairwise=None):
+        if self.margin_cache is None:
+            return self.rank_and_score(schedules, pairwise)
+        if pairwise is None:
+            pairwise = self.order_tables.pairwise_matrix(schedules)
+        return self.margin_cache.rank_and_score(self.rank_and_score, schedules, pairwise)
+
+    # just the ranks for a batch of schedules, use tie_groups on a row to get the candidates sharing each rank
+    def rank_schedules(self, schedules):
+        return self.cached_rank_and_score(schedules)[0]
+
     # abstract method that are implemented in the derived classes
 
     @abstractmethod
@@ -180,15 +364,7 @@ class VotingSystem(ABC):
     # appends the member variable
     def find_condorcet_vios(self, num_trials, distribution, weights = None):
         self.cwc_vio = 0 # to have multiple runs
-        for i in range(0, num_trials):
-            pref_schedule = []
-            if distribution == "IC":
-                pref_schedule = generate_IC_pref(self.num_voters, self.num_cands)
-            elif distribution == "IAC":
-                pref_schedule = generate_IAC_pref(self.num_voters, self.num_cands)
-            elif distribution == "Custom":
-                pref_schedule = custom_distribution(self.num_voters, self.num_cands, weights)
-
+        for pref_schedule in self.generate_schedules(num_trials, distribution, weights):
             vio_cond = self.violates_condorcet(pref_schedule)
             if(vio_cond):
                 #print(pref_schedule)
@@ -235,15 +411,7 @@ class VotingSystem(ABC):
         return False
 
     def find_condorcet_loser_vios(self, num_trials, distribution, weights = None):
-        for i in range(0, num_trials):
-            pref_schedule = []
-            if distribution == "IC":
-                pref_schedule = generate_IC_pref(self.num_voters, self.num_cands)
-            elif distribution == "IAC":
-                pref_schedule = generate_IAC_pref(self.num_voters, self.num_cands)
-            elif distribution == "Custom":
-                pref_schedule = custom_distribution(self.num_voters, self.num_cands, weights)
-
+        for pref_schedule in self.generate_schedules(num_trials, distribution, weights):
             #print(pref_schedule)
             vio_cond_loser = self.violates_condorcet_loser(pref_schedule)
             if(vio_cond_loser):
@@ -254,15 +422,7 @@ class VotingSystem(ABC):
 
 
     def find_joint_violations(self, num_trials, distribution, weights = None):
-        for i in range(0, num_trials):
-            pref_schedule = []
-            if distribution == "IC":
-                pref_schedule = generate_IC_pref(self.num_voters, self.num_cands)
-            elif distribution == "IAC":
-                pref_schedule = generate_IAC_pref(self.num_voters, self.num_cands)
-            elif distribution == "Custom":
-                pref_schedule = custom_distribution(self.num_voters, self.num_cands, weights)
-
+        for pref_schedule in self.generate_schedules(num_trials, distribution, weights):
             cwc_vio = self.violates_condorcet(pref_schedule)
             if (cwc_vio):
                 self.joint += 1
@@ -288,21 +448,32 @@ class VotingSystem(ABC):
 
 
 
+    # checks every criterion in criteria on the same schedules, a batch at a time, sharing the pairwise matrix,
+    # the first place votes and the societal ranking between the checks
+    # self.joint_counts[mask] is how many schedules violated exactly the criteria whose bits are set in mask
+    # (bit i is criteria[i]) and self.criteria_vios has the number of violations of each criterion
+    def find_criteria_table(self, num_trials, distribution, weights=None, criteria=CRITERIA):
+        self.joint_counts = np.zeros(2 ** len(criteria), dtype=np.int64)
+        for batch in self.generate_batches(num_trials, distribution, weights):
+            self.joint_counts += joint_counts(violation_masks(self, batch, criteria), len(criteria))
+        self.criteria_vios = marginal_counts(self.joint_counts, criteria)
+        return self.joint_counts
+
+    # the exact version of find_criteria_table for small elections: every possible schedule is checked once
+    # and weighted by its probability under the distribution ("IC", "IAC" or "Custom"), so self.exact_joint[mask]
+    # and self.exact_vios are probabilities instead of counts (systems that resample for IIA are still random)
+    def find_exact_criteria_table(self, distribution, weights=None, criteria=CRITERIA, num_workers=1):
+        self.exact_joint = exact_joint_parallel(self, distribution, weights, criteria, num_workers)
+        self.exact_vios = marginal_counts(self.exact_joint, criteria)
+        return self.exact_joint
+
     # similar to condorcet function, but this time finds IIA violations for certain range of num_trials
     def find_IIA_violations(self, num_trials, distribution, weights = None):
         self.IIAv = 0
-        for i in range(0, num_trials):
-            pref_schedule = []
-            if distribution == "IC":
-                pref_schedule = generate_IC_pref(self.num_voters, self.num_cands)
-            elif distribution == "IAC":
-                pref_schedule = generate_IAC_pref(self.num_voters, self.num_cands)
-            elif distribution == "Custom":
-                pref_schedule = custom_distribution(self.num_voters, self.num_cands, weights)
-
+        for pref_schedule, count in self.generate_unique_schedules(num_trials, distribution, weights):
             ivio = self.violates_IIA(pref_schedule)
             if(ivio):
-                self.IIAv += 1
+                self.IIAv += count
                 #print(pref_schedule)
             #else:
                 #if 2 not in pref_schedule:
@@ -310,14 +481,9 @@ class VotingSystem(ABC):
 
     # exact same as in plurality
     def simple_set(self,pref_schedule, poss_order):
-        for cand in self.cand_objects:
-            cand.num_votes = 0
-        count = 0
-        for val in pref_schedule:
-            name_of_cand_getting_votes = poss_order[count][0]
-            cand_get_votes = self.find_which_candidate_w_name(name_of_cand_getting_votes)
-            cand_get_votes.num_votes += val
-            count += 1
+        first_votes = self.tally_by_index(self.first_choices(poss_order), pref_schedule)
+        for cand, votes in zip(self.cand_objects, first_votes):
+            cand.num_votes = votes
 
 
     def find_major_cand(self, pref_schedule):
@@ -338,15 +504,7 @@ class VotingSystem(ABC):
 
 
     def find_majority_violations(self, num_trials, distribution, weights = None):
-        for i in range(0, num_trials):
-            pref_schedule = []
-            if distribution == "IC":
-                pref_schedule = generate_IC_pref(self.num_voters, self.num_cands)
-            elif distribution == "IAC":
-                pref_schedule = generate_IAC_pref(self.num_voters, self.num_cands)
-            elif distribution == "Custom":
-                pref_schedule = custom_distribution(self.num_voters, self.num_cands, weights)
-
+        for pref_schedule in self.generate_schedules(num_trials, distribution, weights):
             vios_major = self.violates_majority(pref_schedule)
             if(vios_major):
                 self.majority_vio += 1
@@ -361,153 +519,72 @@ class VotingSystem(ABC):
     # implements the IIA algorithm described in the paper found at link below
     # https://www.sciencedirect.com/science/article/pii/S0176268020300847
     def violates_IIA_paper(self, pref_schedule):
-        IIA_violated = False
+        context = self.evaluation_context(pref_schedule)
         for comp in self.comparisons:
-            winner = 0
-            map_cand = self.create_societal_rank(pref_schedule, self.cand_objects, self.possible_orders)
             one = self.find_which_candidate_w_name(comp[0])
             two = self.find_which_candidate_w_name(comp[1])
+            one_i = self.name_to_index[comp[0]]
+            two_i = self.name_to_index[comp[1]]
             # finds which candidate in comparison is more highly ranked (winner stays 0 if they are the same)
-            if (one.rank < two.rank):
-                winner = 1
-            elif (one.rank > two.rank):
-                winner = 2
-
-            # this approach gives us all the candidates not in the comparison
-            # however taking the name of the first name in modified cand only works with 3 candidates
-            # need to find a way to make the algorithm scale for more candidates
-            modified_cand = self.cand_objects[:]
-            modified_cand.remove(one)
-            modified_cand.remove(two)
-            cand_name = modified_cand[0].name
-
-            # moving C up and down 1 and 2 times
-            poss_pref1 = self.move_up(self.possible_orders, cand_name, 1, one, two)
-            vio1 = self.check_vio(pref_schedule, winner, one, two, poss_pref1)
-            if(vio1 == True):
-                IIA_violated = True
-                break
-
-            poss_pref2 = self.move_up(self.possible_orders, cand_name, 2, one, two)
-            vio2 = self.check_vio(pref_schedule, winner, one, two, poss_pref2)
-            if (vio2 == True):
-                IIA_violated = True
-                break
-
-            poss_pref3 = self.move_down(self.possible_orders, cand_name, 1, one, two)
-            vio3 = self.check_vio(pref_schedule, winner, one, two, poss_pref3)
-            if (vio3 == True):
-                IIA_violated = True
-                break
-
-            poss_pref4 = self.move_down(self.possible_orders, cand_name, 2, one, two)
-            vio4 = self.check_vio(pref_schedule, winner, one, two, poss_pref4)
-            if (vio4 == True):
-                IIA_violated = True
-                break
-
-            # moving the pair being compared up and down 1 spot, first one then two
-            poss_pref5 = self.move_up(self.possible_orders, one.name, 1, one, two)
-            vio5 = self.check_vio(pref_schedule, winner, one, two, poss_pref5)
-            if (vio5 == True):
-                IIA_violated = True
-                break
-
-            poss_pref6 = self.move_down(self.possible_orders, one.name, 1, one, two)
-            vio6 = self.check_vio(pref_schedule, winner, one, two, poss_pref6)
-            if (vio6 == True):
-                IIA_violated = True
-                break
-
-            poss_pref7 = self.move_up(self.possible_orders, two.name, 1, one, two)
-            vio7 = self.check_vio(pref_schedule, winner, one, two, poss_pref7)
-            if (vio7 == True):
-                IIA_violated = True
-                break
-
-            poss_pref8 = self.move_down(self.possible_orders, two.name, 1, one, two)
-            vio8 = self.check_vio(pref_schedule, winner, one, two, poss_pref8)
-            if (vio8 == True):
-                IIA_violated = True
-                break
-
-            # carrying out the simultaneous moves in two separate passes as described in the paper
-            poss_pref9 = self.sim_move_1(winner, one, two)
-            vio9 = self.check_vio(pref_schedule, winner, one, two, poss_pref9)
-            if (vio9 == True):
-                IIA_violated = True
-                break
-
-            poss_pref10 = self.sim_move_2(winner, one, two)
-            vio10 = self.check_vio(pref_schedule, winner, one, two, poss_pref10)
-            if (vio10 == True):
-                IIA_violated = True
-                break
-
-        # good test to see which pref_schedules do not violate IIA
-        return IIA_violated
-        #if(violated==False):
-         #  print(pref_schedule)
+            winner = self.pair_winner(context.ranks[0], one_i, two_i)
+
+            # every move of the paper applied to the schedule at once, then all the new schedules are ranked
+            new_prefs = self.order_tables.remap_schedule(context.schedules[0], self.paper_moves(winner, one, two))
+            new_ranks = self.rank_schedules(new_prefs)
+            one_r = new_ranks[:, one_i]
+            two_r = new_ranks[:, two_i]
+            # for instance if the winner was one but now one is ranked equally or lower than two
+            if winner == 1 and (one_r >= two_r).any():
+                return True
+            elif winner == 2 and (one_r <= two_r).any():
+                return True
+            elif winner == 0 and (one_r != two_r).any():
+                return True
+        return False
 
 
     # function takes an ordering and moves the candidate with cand_name up for every order
     # one and two are also parameters due to conditions of IIA (they cannot swap)
-    # I could make move_up separate and overload it as well to get a move general function
+    # the move is a precomputed map between order indices (see OrderTables.move_map)
     def move_up(self, ordering, cand_name, amt, one, two):
-
-        new_pref = []
-        copy_of_orders = ordering[:]
-        for pref_order in copy_of_orders:
-            list_order = list(pref_order)
-            idx = list_order.index(cand_name)
-            # this checking of one and two works only in the case of three candidates
-            # it can be extended to more
-            if (cand_name == one.name):
-                idx_rival = list_order.index(two.name)
-                if((idx_rival+1) == idx):
-                    new_pref.append(tuple(list_order))
-                    continue
-            elif(cand_name == two.name):
-                idx_rival = list_order.index(one.name)
-                if ((idx_rival + 1) == idx):
-                    new_pref.append(tuple(list_order))
-                    continue
-
-            if (idx >= amt):
-                list_order.remove(cand_name)
-                list_order.insert(idx - amt, cand_name)
-            else:
-                list_order.remove(cand_name)
-                list_order.insert(0, cand_name)
-            new_pref.append(tuple(list_order))
-        return new_pref
+        return self.move_orders(ordering, cand_name, amt, True, one, two)
 
     # analogous logic to move_up
     def move_down(self, ordering,  cand_name, amt, one, two):
-        new_pref = []
-        end = len(ordering) - 1
-        copy_of_orders = ordering[:]
-        for pref_order in copy_of_orders:
-            list_order = list(pref_order)
-            idx = list_order.index(cand_name)
-            if (cand_name == one.name):
-                idx_rival = list_order.index(two.name)
-                if((idx_rival-1) == idx):
-                    new_pref.append(tuple(list_order))
-                    continue
-            elif(cand_name == two.name):
-                idx_rival = list_order.index(one.name)
-                if ((idx_rival - 1) == idx):
-                    new_pref.append(tuple(list_order))
-                    continue
-            if (idx <= (end - amt)):
-                list_order.remove(cand_name)
-                list_order.insert(idx + amt, cand_name)
-            else:
-                list_order.remove(cand_name)
-                list_order.insert(end, cand_name)
-            new_pref.append(tuple(list_order))
-        return new_pref
+        return self.move_orders(ordering, cand_name, amt, False, one, two)
+
+    def move_orders(self, ordering, cand_name, amt, up, one, two):
+        order_map = self.move_map(cand_name, amt, up, one, two)
+        return [self.possible_orders[order_map[self.order_index[tuple(order)]]] for order in ordering]
+
+    def move_map(self, cand_name, amt, up, one, two):
+        pair = (self.name_to_index[one.name], self.name_to_index[two.name])
+        return self.order_tables.move_map(self.name_to_index[cand_name], amt, up, pair)
+
+    # the moves of the paper for the pair one, two as order maps (one row per move)
+    # every other candidate is moved up and down 1 to n-1 places, each of the pair up and down 1 place
+    # and if the pair is not tied the two simultaneous moves (more preferred down and less up, in both orders)
+    def paper_moves(self, winner, one, two):
+        tables = self.order_tables
+        one_i = self.name_to_index[one.name]
+        two_i = self.name_to_index[two.name]
+        pair = (one_i, two_i)
+        maps = []
+        for cand in range(self.num_cands):
+            if cand in pair:
+                continue
+            for up in (True, False):
+                for amt in range(1, self.num_cands):
+                    maps.append(tables.move_map(cand, amt, up, pair))
+        for cand in pair:
+            maps.append(tables.move_map(cand, 1, True, pair))
+            maps.append(tables.move_map(cand, 1, False, pair))
+        if winner != 0:
+            more, less = (one_i, two_i) if winner == 1 else (two_i, one_i)
+            # the second move is applied to the orders the first one made
+            maps.append(tables.move_map(less, 1, True, pair)[tables.move_map(more, 1, False, pair)])
+            maps.append(tables.move_map(more, 1, False, pair)[tables.move_map(less, 1, True, pair)])
+        return np.array(maps)
 
     # implements the two specific simultaneous moves (more preferred down and less up) that the paper suggests
 
@@ -569,15 +646,11 @@ class VotingSystem(ABC):
     # but that would create even fewer IIA violations
 
     def IIA_aliter(self, pref_schedule):
+        context = self.evaluation_context(pref_schedule)
         for comp in self.comparisons:
-            winner = 0
-            map_cand = self.create_societal_rank(pref_schedule, self.cand_objects, self.possible_orders)
             one = self.find_which_candidate_w_name(comp[0])
             two = self.find_which_candidate_w_name(comp[1])
-            if (one.rank < two.rank):
-                winner = 1
-            elif (one.rank > two.rank):
-                winner = 2
+            winner = self.pair_winner(context.ranks[0], self.name_to_index[comp[0]], self.name_to_index[comp[1]])
             to_use_cand = []
             to_use_cand.append(one)
             to_use_cand.append(two)
@@ -617,34 +690,35 @@ class VotingSystem(ABC):
     # if the societal ranking of the pair changes then there exists an IIA violation
     # can increase 100 to greater value if I want to catch more violations
     def violates_IIA(self, pref_schedule):
+        context = self.evaluation_context(pref_schedule)
         for comp in self.comparisons:
-            winner = 0
-            map_cand = self.create_societal_rank(pref_schedule, self.cand_objects, self.possible_orders)
             one = self.find_which_candidate_w_name(comp[0])
             two = self.find_which_candidate_w_name(comp[1])
-            if(one.rank < two.rank):
-                winner = 1
-            elif(one.rank > two.rank):
-                winner = 2
-
-            self.compare(comp,pref_schedule, self.possible_orders)
-            # we use these local values since we call compare again and Condorcet winner changes
-            # compare is called again in create societal rank function (I think specifically for Copeland?)
-            one_c = one.condorcet_points
-            two_c = two.condorcet_points
-
-            # increasing this would increase percentages of violations caught at the cost of speed
-            for j in range(0,300):
-
-                new_pref = self.generate_pref_srr_v2(one, two, one_c, two_c)  # get a new pref with same relative ranks
-                new_map = self.create_societal_rank(new_pref, self.cand_objects, self.possible_orders)
+            one_i = self.name_to_index[comp[0]]
+            two_i = self.name_to_index[comp[1]]
+            # the original schedule is only ranked once, the context keeps its ranks and pairwise matrix
+            winner = self.pair_winner(context.ranks[0], one_i, two_i)
+            one_c = int(context.pairwise[0, one_i, two_i])
+            two_c = int(context.pairwise[0, two_i, one_i])
+
+            # increasing IIA_resamples would increase percentages of violations caught at the cost of speed
+            # all the new prefs with the same relative ranks are generated as one block, which is ranked in
+            # slices that double in size so that an early flip does not pay for ranking the whole block
+            new_prefs = self.generate_pref_srr_block(one, two, one_c, two_c, self.IIA_resamples)
+            start, size = 0, 8
+            while start < len(new_prefs):
+                new_ranks = self.rank_schedules(new_prefs[start:start + size])
+                one_r = new_ranks[:, one_i]
+                two_r = new_ranks[:, two_i]
                 # checks if the relative rank changed
-                if winner == 1 and (one.rank>=two.rank):
+                if winner == 1 and (one_r >= two_r).any():
                     return True
-                elif winner == 2 and (one.rank<=two.rank):
+                elif winner == 2 and (one_r <= two_r).any():
                     return True
-                elif winner == 0 and (one.rank != two.rank):
+                elif winner == 0 and (one_r != two_r).any():
                     return True
+                start += size
+                size *= 2
 
         # good testing statement to see which pref_sc do not violate or 'slipped through'
         #print(pref_schedule)
@@ -669,7 +743,7 @@ class VotingSystem(ABC):
                 choice = rand.randint(0,poss_insertions)
                 ordering.insert(choice,cand.name)
                 poss_insertions += 1 # we need to increment this here, new candidate means one more slot (case of 4)
-            index = self.find_pref_in_all(tuple(ordering))
+            index = order_rank([self.name_to_index[name] for name in ordering])
             arr[index] += 1
 
         # does the same with all the voters who chose [B,A]
@@ -680,107 +754,67 @@ class VotingSystem(ABC):
                 choice = rand.randint(0,poss_insertions)
                 ordering.insert(choice,cand.name)
                 poss_insertions += 1
-            index = self.find_pref_in_all(tuple(ordering))
+            index = order_rank([self.name_to_index[name] for name in ordering])
             arr[index] += 1
 
         return(arr)
 
     # finds which preference order in self.preference orders the ordering corresponds to
+    # (None if it is not a full order of the candidates)
     def find_pref_in_all(self,pref_order):
-        for i in range(0,len(self.possible_orders)):
-            if pref_order == self.possible_orders[i]:
-                return i
+        if len(pref_order) != self.num_cands or set(pref_order) != set(self.cand_names):
+            return None
+        return order_rank([self.name_to_index[name] for name in pref_order])
 
     # this is another method to create a new preference schedule that preserves the relative ranking of A and B
     # this one treats all preference schedules as equally likely
     # there are the same number of voters preferring A over B and B over A --> does not matter which voters
     def generate_pref_srr_v2(self, one, two, one_c, two_c):
-
-        poss_ranks = len(self.possible_orders)
-        arr = np.zeros(poss_ranks, dtype=int)  # this is the array we want to return
-
-        o_index = self.find_index_first_g_second(one, two)  # all indexes where one is greater than two relatively
-        t_index = self.find_index_first_g_second(two, one)  # analogous logic for two
-        orders_one_g_two = poss_ranks / 2
-        num_bounds = int(orders_one_g_two) - 1
-
-        # this uses the 'IAC' method to generate random numbers
-        # needs (num_bounds + 1) random numbers that sum to one_c and two_c
-        end_range1 = num_bounds + one_c
-        end_range2 = num_bounds + two_c
-
-
-        # setting the values for the first candidate in comparison
-        temp_arr = np.zeros(int(orders_one_g_two), dtype=int)
-        vals = rand.sample(range(0, end_range1), num_bounds)  # 2 random vals from 0 to 7 for example (one_c = 6)
-        sorted_vals = sorted(vals)  # sort the values
-        temp_arr[0] = sorted_vals[0]  # the first bar
-        for i in range(1, len(sorted_vals)):
-            temp_arr[i] = sorted_vals[i] - sorted_vals[i - 1] - 1
-        temp_arr[len(sorted_vals)] = end_range1 - sorted_vals[len(sorted_vals) - 1] - 1  # the last bar
-
-        for i in range(0, len(o_index)):
-            arr[o_index[i]] = temp_arr[i]
-
-        # same logic but for B>A
-        # setting the values for the second candidate in comparison
-        temp_arr2 = np.zeros(int(orders_one_g_two), dtype=int)
-        vals2 = rand.sample(range(0, end_range2), num_bounds)
-        sorted_vals2 = sorted(vals2)  # sort the values
-        temp_arr2[0] = sorted_vals2[0]  # the first bar
-        for i in range(1, len(sorted_vals2)):
-            temp_arr2[i] = sorted_vals2[i] - sorted_vals2[i - 1] - 1
-        temp_arr2[len(sorted_vals2)] = end_range2 - sorted_vals2[len(sorted_vals2) - 1] - 1
-        for i in range(0, len(t_index)):
-            arr[t_index[i]] = temp_arr2[i]
-
+        return self.generate_pref_srr_block(one, two, one_c, two_c, 1)[0]
+
+    # generates num_schedules preference schedules at once (num_schedules x n!) where one_c voters prefer one
+    # over two and two_c voters prefer two over one, like the original schedule
+    # this uses the 'IAC' method: each side is a uniformly random way of splitting its voters over the n!/2
+    # orders on that side (the stars and bars of the one schedule version, drawn for every schedule together)
+    def generate_pref_srr_block(self, one, two, one_c, two_c, num_schedules):
+        arr = np.zeros((num_schedules, len(self.possible_orders)), dtype=int)  # this is the array we want to return
+
+        one_i = self.name_to_index[one.name]
+        two_i = self.name_to_index[two.name]
+        o_index = self.order_tables.pair_orders[(one_i, two_i)]  # all indexes where one is greater than two relatively
+        t_index = self.order_tables.pair_orders[(two_i, one_i)]  # analogous logic for two
+        arr[:, o_index] = random_compositions(num_schedules, one_c, len(o_index), self.rng)
+        arr[:, t_index] = random_compositions(num_schedules, two_c, len(t_index), self.rng)
         return arr
 
 
-
-
-
     # finds all indices where the first candidate is greater than the second candidate in the ordering
+    # (read from the table shared by every system with this many candidates)
     def find_index_first_g_second(self, first, second):
-        index_g = []
-        for i in range(0,len(self.possible_orders)):
-            pref_order = self.possible_orders[i]
-            first_i = self.find_index_of(first.name,pref_order)
-            second_i = self.find_index_of(second.name,pref_order)
-            if(first_i < second_i):
-                index_g.append(i)
-        return index_g
+        return self.order_tables.pair_orders[(self.name_to_index[first.name], self.name_to_index[second.name])].tolist()
 
 
     def find_unanimity_vios(self,num_trials, distribution, weights=None):
-        for i in range(0, num_trials):
-            pref_schedule = []
-            if distribution == "IC":
-                pref_schedule = generate_IC_pref(self.num_voters, self.num_cands)
-            elif distribution == "IAC":
-                pref_schedule = generate_IAC_pref(self.num_voters, self.num_cands)
-            elif distribution == "Custom":
-                pref_schedule = custom_distribution(self.num_voters, self.num_cands, weights)
-
+        for pref_schedule in self.generate_schedules(num_trials, distribution, weights):
             vios = self.violates_unanimity(pref_schedule)
             if(vios):
                 self.unam_vios += 1
 
 
     def violates_unanimity(self, preference_schedule):
+        context = self.evaluation_context(preference_schedule)
         for comp in self.comparisons:
-            one = self.find_which_candidate_w_name(comp[0])
-            two = self.find_which_candidate_w_name(comp[1])
-            self.create_societal_rank(preference_schedule,self.cand_objects, self.possible_orders)
+            one_i = self.name_to_index[comp[0]]
+            two_i = self.name_to_index[comp[1]]
             # now we have relative ranking of one and two
-            one_r = one.rank
-            two_r = two.rank
-            self.compare(comp,preference_schedule,self.possible_orders)
-            if(one.condorcet_points == self.num_voters):
+            one_r = context.ranks[0][one_i]
+            two_r = context.ranks[0][two_i]
+            pairwise = context.pairwise[0]
+            if(pairwise[one_i, two_i] == self.num_voters):
                 if(one_r >= two_r):
                     #print(preference_schedule)
                     return True
-            elif(two.condorcet_points == self.num_voters):
+            elif(pairwise[two_i, one_i] == self.num_voters):
                 if(two_r >= one_r):
                     #print(preference_schedule)
                     return True
@@ -789,15 +823,7 @@ class VotingSystem(ABC):
 
 
     def find_transitivity_vios(self,num_trials, distribution, weights=None):
-        for i in range(0, num_trials):
-            pref_schedule = []
-            if distribution == "IC":
-                pref_schedule = generate_IC_pref(self.num_voters, self.num_cands)
-            elif distribution == "IAC":
-                pref_schedule = generate_IAC_pref(self.num_voters, self.num_cands)
-            elif distribution == "Custom":
-                pref_schedule = custom_distribution(self.num_voters, self.num_cands, weights)
-
+        for pref_schedule in self.generate_schedules(num_trials, distribution, weights):
             vios = False
             if self.type() == "Pairwise Majority":
                 vios = self.pairwise_majority_violates_transitivity(pref_schedule) # this is for pairwise majority
@@ -814,14 +840,15 @@ class VotingSystem(ABC):
 
 
     def violates_transitivity_real(self, pref_schedule):
+        context = self.evaluation_context(pref_schedule)
         for comp in self.three_element_comps:
-            # get the three candidates for comparison
-            one = self.find_which_candidate_w_name(comp[0])
-            two = self.find_which_candidate_w_name(comp[1])
-            three = self.find_which_candidate_w_name(comp[2])
-            self.create_societal_rank(pref_schedule, self.cand_objects, self.possible_orders)
-            if(one.rank<=two.rank and two.rank<=three.rank):
-                if(one.rank > three.rank):
+            # get the ranks of the three candidates for comparison
+            ranks = context.ranks[0]
+            one_r = ranks[self.name_to_index[comp[0]]]
+            two_r = ranks[self.name_to_index[comp[1]]]
+            three_r = ranks[self.name_to_index[comp[2]]]
+            if(one_r<=two_r and two_r<=three_r):
+                if(one_r > three_r):
                     return True
         return False
 
@@ -835,17 +862,15 @@ class VotingSystem(ABC):
             summer = 1
             #self.condorcet_count += 1
         # checks to find a condorcet cycle in each three element subset
+        pairwise = self.pairwise_tally(pref_schedule)
         for comp in self.three_element_comps:
             # get the three candidates for comparison
-            one = self.find_which_candidate_w_name(comp[0])
-            two = self.find_which_candidate_w_name(comp[1])
-            three = self.find_which_candidate_w_name(comp[2])
-            self.compare([comp[0], comp[1]], pref_schedule, self.possible_orders)
-            if (one.condorcet_points >= two.condorcet_points):  # I defined the relational operator in the class
-                self.compare([comp[1], comp[2]], pref_schedule, self.possible_orders)
-                if (two.condorcet_points >= three.condorcet_points):
-                    self.compare([comp[0], comp[2]], pref_schedule, self.possible_orders)
-                    if ((one.condorcet_points >= three.condorcet_points) == False):
+            one = self.name_to_index[comp[0]]
+            two = self.name_to_index[comp[1]]
+            three = self.name_to_index[comp[2]]
+            if (pairwise[one, two] >= pairwise[two, one]):
+                if (pairwise[two, three] >= pairwise[three, two]):
+                    if ((pairwise[one, three] >= pairwise[three, one]) == False):
                         return True
         return False
 
@@ -855,17 +880,15 @@ class VotingSystem(ABC):
         #if (self.find_Condorcet_candidate(pref_schedule) is not None):
         #    return False
         # checks to find a condorcet cycle in each three element subset
+        pairwise = self.pairwise_tally(pref_schedule)
         for comp in self.three_element_comps:
             # get the three candidates for comparison
-            one = self.find_which_candidate_w_name(comp[0])
-            two = self.find_which_candidate_w_name(comp[1])
-            three = self.find_which_candidate_w_name(comp[2])
-            self.compare([comp[0], comp[1]], pref_schedule, self.possible_orders)
-            if (one.condorcet_points >= two.condorcet_points):  # I defined the relational operator in the class
-                self.compare([comp[1], comp[2]], pref_schedule, self.possible_orders)
-                if (two.condorcet_points > three.condorcet_points):
-                    self.compare([comp[0], comp[2]], pref_schedule, self.possible_orders)
-                    if ((one.condorcet_points > three.condorcet_points) == False):
+            one = self.name_to_index[comp[0]]
+            two = self.name_to_index[comp[1]]
+            three = self.name_to_index[comp[2]]
+            if (pairwise[one, two] >= pairwise[two, one]):
+                if (pairwise[two, three] > pairwise[three, two]):
+                    if ((pairwise[one, three] > pairwise[three, one]) == False):
                         return True
         return False
 
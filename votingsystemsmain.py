@@ -29,6 +29,22 @@ def main():
     # output the results
     print(f"IIA violations: {c.IIAv}")
 
+    # with this few voters every schedule can be checked, which gives exact probabilities
+    # c.find_exact_criteria_table("IC")
+    # print(c.exact_vios)
+
+    # or instead of picking the number of trials, keep going until the rate is known to within 1%
+    # from sequential import run_sequential
+    # run_sequential(c, "find_condorcet_vios", "IC", half_width_target=0.01, max_seconds=60)
+
+    # rare violations (close to 0 under IC) are estimated with far fewer trials by oversampling near ties
+    # from importance import importance_estimates
+    # importance_estimates([c], "IC", 10000, criteria=("condorcet_loser", "majority"))
+
+    # bigger runs can be split over several processes, the counts only depend on the seed
+    # from parallel import run_parallel
+    # run_parallel(c, "find_IIA_violations", 100000, "IC", seed=2025, num_workers=8)
+
 
 if __name__ == '__main__':
     main()